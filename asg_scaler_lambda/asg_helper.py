@@ -1,12 +1,24 @@
 import boto3
+import json
 import logging
+import os
+import time
+from asg_scaler_lambda.circuit_breaker import CircuitOpenError, get_circuit_breaker, get_client_config
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Define constants
+CAPACITY_TYPES = ('units', 'vcpu', 'memory-mib')
+DEFAULT_DESCRIBE_CACHE_TTL = 300
+PRESCALE_TAG_KEY = 'asg-scaler:prescale'
 
-def update_asg(asg_name, min_capacity, desired_capacity, max_capacity):
+# Mixed instances policies cached across warm invocations: asg_name -> (policy, fetched_at)
+_policy_cache = {}
+
+
+def update_asg(asg_name, min_capacity, desired_capacity, max_capacity, desired_capacity_type=None):
     """
     Update the specified Auto Scaling Group's capacities.
     Converts string input to integers and validates them before updating.
@@ -15,8 +27,11 @@ def update_asg(asg_name, min_capacity, desired_capacity, max_capacity):
     :param min_capacity: The minimum size of the ASG
     :param desired_capacity: The desired size of the ASG
     :param max_capacity: The maximum size of the ASG
+    :param desired_capacity_type: Optional unit of the capacities: 'units', 'vcpu' or 'memory-mib'.
+        When given, the ASG's mixed instances policy is checked so the capacities match its instance weights.
     :return: A success message string
     :raises ValueError: If the validation fails or the update operation fails
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
     """
     try:
         min_capacity = int(min_capacity)
@@ -27,26 +42,37 @@ def update_asg(asg_name, min_capacity, desired_capacity, max_capacity):
         raise ValueError("Capacity parameters must be integers.")
 
     valid, message = validate_capacities(min_capacity, desired_capacity, max_capacity)
+    if valid and desired_capacity_type is not None:
+        valid, message = validate_capacity_type(
+            desired_capacity_type, desired_capacity, get_mixed_instances_policy(asg_name)
+        )
     if not valid:
         logger.debug(message)
         raise ValueError(message)
 
-    client = boto3.client('autoscaling')
+    request = {
+        'AutoScalingGroupName': asg_name,
+        'MinSize': min_capacity,
+        'MaxSize': max_capacity,
+        'DesiredCapacity': desired_capacity
+    }
+    if desired_capacity_type is not None:
+        request['DesiredCapacityType'] = desired_capacity_type
+
+    client = boto3.client('autoscaling', config=get_client_config())
     try:
-        client.update_auto_scaling_group(
-            AutoScalingGroupName=asg_name,
-            MinSize=min_capacity,
-            MaxSize=max_capacity,
-            DesiredCapacity=desired_capacity
-        )
+        get_circuit_breaker('autoscaling').call(client.update_auto_scaling_group, **request)
         success_message = (
             f"Successfully updated ASG '{asg_name}' settings: "
             f"Min={min_capacity}, "
             f"Desired={desired_capacity}, "
-            f"Max={max_capacity}."
+            f"Max={max_capacity}"
+            f"{f' ({desired_capacity_type})' if desired_capacity_type else ''}."
         )
         logger.debug(success_message)
         return success_message
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.debug(f"Failed to update ASG '{asg_name}': {e}")
         raise ValueError(f"Failed to update ASG '{asg_name}': {e}")
@@ -67,3 +93,302 @@ def validate_capacities(min_capacity, desired_capacity, max_capacity):
     if min_capacity > desired_capacity or desired_capacity > max_capacity or min_capacity > max_capacity:
         return False, "Incompatible settings: Check your capacity settings."
     return True, ""
+
+
+def get_mixed_instances_policy(asg_name):
+    """
+    Describe the ASG's mixed instances policy, caching it across warm invocations for
+    ASG_DESCRIBE_CACHE_TTL seconds.
+
+    :param asg_name: The name of the Auto Scaling Group
+    :return: The MixedInstancesPolicy dict, or None if the ASG does not use one
+    :raises ValueError: If the ASG cannot be described
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    ttl = float(os.environ.get('ASG_DESCRIBE_CACHE_TTL', DEFAULT_DESCRIBE_CACHE_TTL))
+    cached = _policy_cache.get(asg_name)
+    if cached and time.monotonic() - cached[1] < ttl:
+        return cached[0]
+
+    client = boto3.client('autoscaling', config=get_client_config())
+    try:
+        response = get_circuit_breaker('autoscaling').call(
+            client.describe_auto_scaling_groups, AutoScalingGroupNames=[asg_name]
+        )
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to describe ASG '{asg_name}': {e}")
+    if not response['AutoScalingGroups']:
+        raise ValueError(f"ASG '{asg_name}' not found.")
+
+    policy = response['AutoScalingGroups'][0].get('MixedInstancesPolicy')
+    _policy_cache[asg_name] = (policy, time.monotonic())
+    return policy
+
+
+def clear_policy_cache():
+    _policy_cache.clear()
+
+
+def get_instance_weights(policy):
+    """
+    :param policy: A MixedInstancesPolicy dict, or None
+    :return: The WeightedCapacity of each launch template override that sets one
+    """
+    overrides = (policy or {}).get('LaunchTemplate', {}).get('Overrides', [])
+    return [int(o['WeightedCapacity']) for o in overrides if o.get('WeightedCapacity')]
+
+
+def validate_capacity_type(desired_capacity_type, desired_capacity, policy):
+    """
+    Validate a desired capacity type against the ASG's mixed instances policy.
+    vCPU and memory targets need attribute-based instance selection; weighted unit targets
+    must be able to launch at least the smallest weighted instance.
+
+    :param desired_capacity_type: 'units', 'vcpu' or 'memory-mib'
+    :param desired_capacity: The desired capacity in that unit
+    :param policy: The ASG's MixedInstancesPolicy dict, or None
+    :return: A tuple (bool, str) where the first element indicates success/failure, and the second is the error message
+    """
+    if desired_capacity_type not in CAPACITY_TYPES:
+        return False, (
+            f"Invalid DesiredCapacityType '{desired_capacity_type}': must be one of {', '.join(CAPACITY_TYPES)}."
+        )
+    if desired_capacity_type != 'units':
+        overrides = (policy or {}).get('LaunchTemplate', {}).get('Overrides', [])
+        if not any('InstanceRequirements' in o for o in overrides):
+            return False, f"DesiredCapacityType '{desired_capacity_type}' requires attribute-based instance selection."
+        return True, ""
+    weights = get_instance_weights(policy)
+    if weights and 0 < desired_capacity < min(weights):
+        return False, (
+            f"Desired capacity {desired_capacity} is smaller than the smallest instance weight {min(weights)}."
+        )
+    return True, ""
+
+
+def build_fallback_overrides(asg_name, policy, instance_types):
+    overrides = policy.get('LaunchTemplate', {}).get('Overrides', [])
+    if any('InstanceRequirements' in o for o in overrides):
+        raise ValueError(
+            f"ASG '{asg_name}' uses attribute-based instance selection; instance type fallback is not supported."
+        )
+    if isinstance(instance_types, dict):
+        try:
+            return [
+                {'InstanceType': instance_type, 'WeightedCapacity': str(int(weight))}
+                for instance_type, weight in instance_types.items()
+            ]
+        except (TypeError, ValueError):
+            raise ValueError('Fallback instance type weights must be integers.')
+    if get_instance_weights(policy):
+        raise ValueError(
+            f"ASG '{asg_name}' uses weighted capacity; fallbackInstanceTypes must map each instance type to its weight."
+        )
+    return [{'InstanceType': instance_type} for instance_type in instance_types]
+
+
+def apply_instance_type_fallback(asg_name, instance_types):
+    """
+    Replace the instance types the ASG may launch, keeping its launch template and any
+    instances distribution. Used when launches keep failing for the current types.
+    Weighted ASGs need a {instance_type: weight} mapping so their capacity units keep their meaning,
+    and ASGs using attribute-based instance selection are refused.
+
+    :param asg_name: The name of the Auto Scaling Group to update
+    :param instance_types: The alternate instance types to launch, as a list or a {instance_type: weight} mapping
+    :raises ValueError: If the fallback does not suit the ASG's policy, or the update fails
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    client = boto3.client('autoscaling', config=get_client_config())
+    breaker = get_circuit_breaker('autoscaling')
+    try:
+        groups = breaker.call(
+            client.describe_auto_scaling_groups, AutoScalingGroupNames=[asg_name]
+        )['AutoScalingGroups']
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to describe ASG '{asg_name}': {e}")
+    if not groups:
+        raise ValueError(f"ASG '{asg_name}' not found.")
+
+    group = groups[0]
+    policy = dict(group.get('MixedInstancesPolicy') or {})
+    template = policy.get('LaunchTemplate', {}).get('LaunchTemplateSpecification') or group.get('LaunchTemplate')
+    if not template:
+        raise ValueError(f"ASG '{asg_name}' has no launch template to fall back from.")
+    template = {k: v for k, v in template.items() if k != 'LaunchTemplateName' or 'LaunchTemplateId' not in template}
+    policy['LaunchTemplate'] = {
+        'LaunchTemplateSpecification': template,
+        'Overrides': build_fallback_overrides(asg_name, policy, instance_types)
+    }
+
+    try:
+        breaker.call(client.update_auto_scaling_group, AutoScalingGroupName=asg_name, MixedInstancesPolicy=policy)
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to apply fallback instance types to ASG '{asg_name}': {e}")
+    _policy_cache.pop(asg_name, None)
+
+
+def asg_at_capacity(asg_name, min_capacity, desired_capacity, max_capacity, desired_capacity_type=None):
+    """
+    Check whether the specified Auto Scaling Group already has the given capacities,
+    for example because it was pre-scaled by an earlier pipeline stage.
+
+    :param asg_name: The name of the Auto Scaling Group to check
+    :param min_capacity: The expected minimum size of the ASG
+    :param desired_capacity: The expected desired size of the ASG
+    :param max_capacity: The expected maximum size of the ASG
+    :param desired_capacity_type: The expected capacity unit, if any
+    :return: True if the ASG matches all three capacities, else False
+    """
+    client = boto3.client('autoscaling', config=get_client_config())
+    try:
+        expected = (int(min_capacity), int(desired_capacity), int(max_capacity))
+        response = get_circuit_breaker('autoscaling').call(
+            client.describe_auto_scaling_groups, AutoScalingGroupNames=[asg_name]
+        )
+        groups = response['AutoScalingGroups']
+    except Exception as e:
+        logger.debug(f"Unable to check capacity of ASG '{asg_name}': {e}")
+        return False
+    if not groups:
+        return False
+    group = groups[0]
+    if desired_capacity_type is not None and group.get('DesiredCapacityType', 'units') != desired_capacity_type:
+        return False
+    return (group['MinSize'], group['DesiredCapacity'], group['MaxSize']) == expected
+
+
+def describe_asg(asg_name):
+    """
+    Describe a single Auto Scaling Group, including its tags.
+
+    :param asg_name: The name of the Auto Scaling Group
+    :return: The group dict returned by DescribeAutoScalingGroups
+    :raises ValueError: If the ASG cannot be described or is not found
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    client = boto3.client('autoscaling', config=get_client_config())
+    try:
+        groups = get_circuit_breaker('autoscaling').call(
+            client.describe_auto_scaling_groups, AutoScalingGroupNames=[asg_name]
+        )['AutoScalingGroups']
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to describe ASG '{asg_name}': {e}")
+    if not groups:
+        raise ValueError(f"ASG '{asg_name}' not found.")
+    return groups[0]
+
+
+def get_prescale_record(group):
+    """
+    :param group: A group dict returned by describe_asg
+    :return: The pre-scale record tagged on the group, or None if it was not pre-scaled
+    """
+    for tag in group.get('Tags', []):
+        if tag.get('Key') == PRESCALE_TAG_KEY:
+            try:
+                return json.loads(tag['Value'])
+            except (TypeError, ValueError):
+                logger.debug(f"Ignoring malformed {PRESCALE_TAG_KEY} tag on ASG '{group.get('AutoScalingGroupName')}'.")
+    return None
+
+
+def record_prescale(asg_name, pipeline_name, execution_id, now=None):
+    """
+    Tag the ASG with the pipeline execution about to pre-scale it and the capacity to restore
+    if that execution never reaches its deployment. The tag lives on the ASG so that whichever
+    container handles the execution's end can find it. An ASG already pre-scaled by an earlier
+    execution keeps its original capacity in the record.
+
+    :param asg_name: The name of the Auto Scaling Group about to be pre-scaled
+    :param pipeline_name: The pipeline whose stage triggered the pre-scale
+    :param execution_id: The pipeline execution ID
+    :param now: The pre-scale time in epoch seconds, defaults to the current time
+    :return: The record written to the tag
+    :raises ValueError: If the ASG cannot be described or tagged
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    group = describe_asg(asg_name)
+    record = get_prescale_record(group) or {
+        'min': group['MinSize'], 'desired': group['DesiredCapacity'], 'max': group['MaxSize']
+    }
+    if 'type' not in record and group.get('DesiredCapacityType'):
+        record['type'] = group['DesiredCapacityType']
+    record.update({
+        'pipeline': pipeline_name, 'execution': execution_id, 'at': int(time.time() if now is None else now)
+    })
+
+    client = boto3.client('autoscaling', config=get_client_config())
+    try:
+        get_circuit_breaker('autoscaling').call(client.create_or_update_tags, Tags=[{
+            'ResourceId': asg_name,
+            'ResourceType': 'auto-scaling-group',
+            'Key': PRESCALE_TAG_KEY,
+            'Value': json.dumps(record, separators=(',', ':')),
+            'PropagateAtLaunch': False
+        }])
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to record pre-scale of ASG '{asg_name}': {e}")
+    return record
+
+
+def clear_prescale_record(asg_name):
+    """
+    :raises ValueError: If the tag cannot be deleted
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    client = boto3.client('autoscaling', config=get_client_config())
+    try:
+        get_circuit_breaker('autoscaling').call(client.delete_tags, Tags=[{
+            'ResourceId': asg_name, 'ResourceType': 'auto-scaling-group', 'Key': PRESCALE_TAG_KEY
+        }])
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to clear pre-scale record of ASG '{asg_name}': {e}")
+
+
+def take_over_prescale(asg_name):
+    """
+    Hand a pre-scaled ASG over to the deployment job, so that the pre-scale is no longer
+    undone if the execution later fails.
+
+    :param asg_name: The name of the Auto Scaling Group
+    :return: The pre-scale record, or None if the ASG was not pre-scaled
+    :raises ValueError: If the ASG cannot be described or the record cannot be cleared
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    record = get_prescale_record(describe_asg(asg_name))
+    if record is not None:
+        clear_prescale_record(asg_name)
+    return record
+
+
+def restore_prescaled_capacity(asg_name, pipeline_name, execution_id):
+    """
+    Undo a pre-scale made for a pipeline execution that ended before its deployment took over the ASG.
+    ASGs pre-scaled by another execution, or not pre-scaled at all, are left alone.
+
+    :param asg_name: The name of the Auto Scaling Group
+    :param pipeline_name: The name of the pipeline whose execution ended
+    :param execution_id: The ID of the execution that ended
+    :return: The update_asg success message, or None if there was nothing to restore
+    :raises ValueError: If the ASG cannot be described, updated or untagged
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    record = get_prescale_record(describe_asg(asg_name))
+    if not record or (record.get('pipeline'), record.get('execution')) != (pipeline_name, execution_id):
+        return None
+    message = update_asg(asg_name, record['min'], record['desired'], record['max'], record.get('type'))
+    clear_prescale_record(asg_name)
+    return message
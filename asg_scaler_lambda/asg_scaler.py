@@ -1,63 +1,96 @@
 import json
 import logging
+import time
 from asg_scaler_lambda.codepipeline_event import (
     report_job_success, report_job_failure,
-    get_approval_token, approve_action
+    get_approval_token, approve_action, approve_actions
+)
+from asg_scaler_lambda.asg_helper import (
+    update_asg, asg_at_capacity, record_prescale, take_over_prescale, restore_prescaled_capacity
+)
+from asg_scaler_lambda.circuit_breaker import CircuitOpenError
+from asg_scaler_lambda.profile_store import (
+    PROFILE_KEY, ProfileError, resolve_user_parameters, get_profiles
+)
+from asg_scaler_lambda.routing_config import (
+    ConfigError, get_prescale_profiles, get_pipeline_prescale_profiles, get_configured_approvals
+)
+from asg_scaler_lambda.timeline import STAGE_PREFIX, STAGE_STARTED_PREFIX, record_phase
+from asg_scaler_lambda.launch_watcher import (
+    WATCHING, FAILED, watch_enabled, start_watch, check_watch, get_prescale_since
+)
+from asg_scaler_lambda.event_models import (
+    CODE_PIPELINE_JOB_KEY, CODE_DEPLOY_SOURCE, CODE_PIPELINE_SOURCE, STAGE_STATE_CHANGE, EXECUTION_STATE_CHANGE,
+    EventParseError, CodePipelineJob, get_event_source, parse_codepipeline_job, parse_asg_target,
+    parse_codedeploy_state_change, parse_stage_state_change, parse_execution_state_change, parse_approval_targets
 )
-from asg_scaler_lambda.asg_helper import update_asg
-
-# Define constant
-CODE_PIPELINE_JOB_KEY = 'CodePipeline.job'
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Define constants
+INSERVICE_PHASE = 'inservice'
+
 
 def lambda_handler(event, context):
     logger.info(f"Received event: {event}")
-    if CODE_PIPELINE_JOB_KEY in event:
-        return handle_codepipeline_event(event)
-    elif event.get('source') == 'aws.codedeploy' and event.get('detail', {}).get('state') == 'SUCCESS':
-        return handle_eventbridge_event(event)
-    else:
-        logger.warning('Event source not recognised.')
-        return {'statusCode': 400, 'body': 'Event source not recognised.'}
+    handler = EVENT_HANDLERS.get(get_event_source(event))
+    if handler is None:
+        return unrecognised_event()
+    return handler(event)
 
 
-def handle_codepipeline_event(event):
-    job_id = event[CODE_PIPELINE_JOB_KEY]['id'] if CODE_PIPELINE_JOB_KEY in event else None
+def unrecognised_event():
+    logger.warning('Event source not recognised.')
+    return {'statusCode': 400, 'body': 'Event source not recognised.'}
 
-    code_pipeline_job = event.get(CODE_PIPELINE_JOB_KEY, {})
-    job_data = code_pipeline_job.get('data', {})
-    action_configuration = job_data.get('actionConfiguration', {})
-    configuration = action_configuration.get('configuration', {})
-    user_parameters_str = configuration.get('UserParameters', '{}')
 
+def handle_codepipeline_event(event):
     try:
-        user_parameters = json.loads(user_parameters_str)
-    except json.JSONDecodeError:
-        report_job_failure(job_id, 'Invalid UserParameters format.')
-        logger.error(f"Invalid UserParameters format for job {job_id}.")
-        return {'statusCode': 400, 'body': json.dumps('Invalid UserParameters format.')}
-
-    params = (
-        user_parameters.get('asgName'),
-        user_parameters.get('minCapacity'),
-        user_parameters.get('desiredCapacity'),
-        user_parameters.get('maxCapacity')
-    )
+        job = parse_codepipeline_job(event)
+    except EventParseError as pe:
+        report_job_failure(pe.job_id, str(pe))
+        logger.error(f"{pe} (job {pe.job_id})")
+        return {'statusCode': 400, 'body': json.dumps(str(pe))}
 
-    if not all(params) or any(x is None for x in params):
-        report_job_failure(job_id, 'Missing required parameters.')
-        logger.error(f"Missing required parameters for job {job_id}.")
-        return {'statusCode': 400, 'body': json.dumps('Missing required parameters.')}
+    job_id = job.job_id
+    uses_profile = PROFILE_KEY in job.user_parameters
+    try:
+        job.user_parameters = resolve_user_parameters(job.user_parameters)
+        target = parse_asg_target(job)
+    except (EventParseError, ProfileError) as pe:
+        report_job_failure(job_id, str(pe))
+        logger.error(f"{pe} (job {job_id})")
+        return {'statusCode': 400, 'body': json.dumps(str(pe))}
 
+    params = job.user_parameters
     try:
-        message = update_asg(*params)
+        if job.continuation_token:
+            return continue_launch_watch(job, target)
+        if uses_profile and asg_at_capacity(*target.as_args(), **target.as_kwargs()):
+            # Already pre-scaled by an earlier stage, so only confirm the capacity and take it over
+            since = get_prescale_since(take_over_prescale(target.asg_name))
+            prescaled = True
+            message = f"ASG '{target.asg_name}' already at target capacity."
+        else:
+            since = time.time()
+            prescaled = False
+            message = update_asg(*target.as_args(), **target.as_kwargs())
+        if watch_enabled(params):
+            watch = start_watch(target.asg_name, params, since, prescaled=prescaled)
+            report_job_success(job_id, continuation_token=watch.continuation_token)
+            record_job_phase(params, target, params.get('phase', 'scale'))
+            logger.info(f"{message} {watch.message} (job {job_id})")
+            return {'statusCode': 202, 'body': json.dumps(message)}
         report_job_success(job_id)
+        record_job_phase(params, target, params.get('phase', 'scale'))
         logger.info(f"Successfully processed CodePipeline job {job_id}: {message}")
         return {'statusCode': 200, 'body': json.dumps(message)}
+    except CircuitOpenError as ce:
+        report_job_failure(job_id, str(ce))
+        logger.error(f"Failing fast for job {job_id}: {str(ce)}")
+        return {'statusCode': 503, 'body': json.dumps(str(ce))}
     except ValueError as ve:
         report_job_failure(job_id, str(ve))
         logger.error(f"Validation Error for job {job_id}: {str(ve)}")
@@ -68,15 +101,60 @@ def handle_codepipeline_event(event):
         return {'statusCode': 500, 'body': json.dumps(f"Error: {str(e)}")}
 
 
+def continue_launch_watch(job, target):
+    job_id = job.job_id
+    params = job.user_parameters
+    watch = check_watch(job.continuation_token, params)
+    if watch.status == FAILED:
+        report_job_failure(job_id, watch.message)
+        logger.error(f"{watch.message} (job {job_id})")
+        return {'statusCode': 500, 'body': json.dumps(watch.message)}
+    if watch.status == WATCHING:
+        report_job_success(job_id, continuation_token=watch.continuation_token)
+        logger.info(f"{watch.message} (job {job_id})")
+        return {'statusCode': 202, 'body': json.dumps(watch.message)}
+
+    report_job_success(job_id)
+    # The job's own phase was recorded when the watch started, so this marks the launches being InService
+    record_job_phase(params, target, INSERVICE_PHASE)
+    logger.info(f"Successfully processed CodePipeline job {job_id}: {watch.message}")
+    return {'statusCode': 200, 'body': json.dumps(watch.message)}
+
+
+def record_job_phase(params, target, phase):
+    record_phase(params.get('pipelineName'), params.get('executionId'), target.asg_name, phase)
+
+
 def handle_eventbridge_event(event):
     logger.info(f"Processing EventBridge event: {event}")
-    pipeline_name = event.get('pipelineName')
-    stage_name = event.get('stageName')
-    action_name = event.get('actionName')
+    change = parse_codedeploy_state_change(event)
+    if not change.succeeded:
+        return unrecognised_event()
 
-    token = get_approval_token(pipeline_name, stage_name, action_name)
+    try:
+        configured = get_configured_approvals(change.application, change.deployment_group)
+    except ConfigError as ce:
+        logger.error(f"Unable to resolve approvals for deployment group {change.deployment_group}: {ce}")
+        return {'statusCode': 400, 'body': json.dumps(str(ce))}
+    approvals = list(dict.fromkeys(a.as_args() for a in change.approvals + parse_approval_targets(configured)))
+    if not approvals:
+        logger.warning('No approval actions named by the event or configured for its deployment group.')
+        return {'statusCode': 400, 'body': 'No approval actions to approve.'}
+    record_execution_phase(change, 'codedeploy')
+    if len(approvals) > 1:
+        return handle_multiple_approvals(change, approvals)
+
+    pipeline_name, stage_name, action_name = approvals[0]
+
+    try:
+        token = get_approval_token(pipeline_name, stage_name, action_name)
+    except CircuitOpenError as ce:
+        logger.error(f"Failing fast for pipeline {pipeline_name}: {str(ce)}")
+        return {'statusCode': 503, 'body': json.dumps(str(ce))}
     if token:
         result = approve_action(pipeline_name, stage_name, action_name, token)
+        if result['statusCode'] == 200 and pipeline_name == change.pipeline_name:
+            record_execution_phase(change, 'approval')
         logger.info(f"EventBridge event processed for pipeline {pipeline_name}. Result: {result}")
         return result
     else:
@@ -86,3 +164,120 @@ def handle_eventbridge_event(event):
         )
 
         return {'statusCode': 400, 'body': 'Approval token not found.'}
+
+
+def record_execution_phase(change, phase):
+    # The event's executionId belongs to its own pipeline only, so other pipelines are not recorded
+    if change.pipeline_name:
+        record_phase(change.pipeline_name, change.execution_id, None, phase)
+
+
+def handle_multiple_approvals(change, approvals):
+    results = approve_actions(approvals)
+    approved = [r for r in results if r['statusCode'] == 200]
+    if any(r['pipelineName'] == change.pipeline_name for r in approved):
+        record_execution_phase(change, 'approval')
+    logger.info(f"Approved {len(approved)} of {len(results)} actions. Results: {results}")
+
+    if len(approved) == len(results):
+        status_code = 200
+    elif approved:
+        status_code = 207
+    else:
+        status_code = max(r['statusCode'] for r in results)
+    return {'statusCode': status_code, 'body': json.dumps(results)}
+
+
+def handle_stage_event(event):
+    change = parse_stage_state_change(event)
+    if change is not None and change.succeeded:
+        record_phase(change.pipeline_name, change.execution_id, None, f"{STAGE_PREFIX}{change.stage_name}")
+        return {'statusCode': 200, 'body': json.dumps([])}
+    if change is None or not change.started:
+        return unrecognised_event()
+    record_phase(change.pipeline_name, change.execution_id, None, f"{STAGE_STARTED_PREFIX}{change.stage_name}")
+
+    try:
+        names = get_prescale_profiles(change.pipeline_name, change.stage_name)
+        if not names:
+            logger.info(f"No pre-scaling configured for stage {change.stage_name} of {change.pipeline_name}.")
+            return {'statusCode': 200, 'body': json.dumps([])}
+        profiles = get_profiles(names)
+    except (ConfigError, ProfileError) as pe:
+        logger.error(f"Pre-scaling failed for pipeline {change.pipeline_name}: {pe}")
+        return {'statusCode': 400, 'body': json.dumps(str(pe))}
+
+    messages = []
+    failed = False
+    for name in names:
+        try:
+            target = parse_asg_target(CodePipelineJob(None, profiles[name], None))
+            # Recorded first so the pre-scale can be undone if the execution never reaches its deployment
+            record_prescale(target.asg_name, change.pipeline_name, change.execution_id)
+            messages.append(update_asg(*target.as_args(), **target.as_kwargs()))
+            record_phase(change.pipeline_name, change.execution_id, target.asg_name, 'prescale')
+        except (ValueError, CircuitOpenError) as ve:
+            failed = True
+            messages.append(f"Profile '{name}': {ve}")
+            logger.error(f"Pre-scaling profile '{name}' failed for pipeline {change.pipeline_name}: {ve}")
+
+    logger.info(
+        f"Pre-scaled for stage {change.stage_name} of pipeline {change.pipeline_name} "
+        f"(execution {change.execution_id}): {messages}"
+    )
+    return {'statusCode': 500 if failed else 200, 'body': json.dumps(messages)}
+
+
+def handle_execution_event(event):
+    change = parse_execution_state_change(event)
+    if change is None or not change.abandoned:
+        return unrecognised_event()
+
+    try:
+        names = get_pipeline_prescale_profiles(change.pipeline_name)
+        if not names:
+            return {'statusCode': 200, 'body': json.dumps([])}
+        profiles = get_profiles(names)
+    except (ConfigError, ProfileError) as pe:
+        logger.error(f"Unable to restore pre-scaled ASGs for pipeline {change.pipeline_name}: {pe}")
+        return {'statusCode': 400, 'body': json.dumps(str(pe))}
+
+    messages = []
+    failed = False
+    for name in names:
+        try:
+            target = parse_asg_target(CodePipelineJob(None, profiles[name], None))
+            message = restore_prescaled_capacity(target.asg_name, change.pipeline_name, change.execution_id)
+            if message:
+                messages.append(message)
+        except (ValueError, CircuitOpenError) as ve:
+            failed = True
+            messages.append(f"Profile '{name}': {ve}")
+            logger.error(f"Restoring profile '{name}' failed for pipeline {change.pipeline_name}: {ve}")
+
+    logger.info(
+        f"Execution {change.execution_id} of pipeline {change.pipeline_name} ended {change.state}; "
+        f"restored pre-scaled ASGs: {messages}"
+    )
+    return {'statusCode': 500 if failed else 200, 'body': json.dumps(messages)}
+
+
+def handle_pipeline_event(event):
+    handler = PIPELINE_EVENT_HANDLERS.get(event.get('detail-type'))
+    if handler is None:
+        return unrecognised_event()
+    return handler(event)
+
+
+# Dispatch table keyed by the value returned from get_event_source
+EVENT_HANDLERS = {
+    CODE_PIPELINE_JOB_KEY: handle_codepipeline_event,
+    CODE_DEPLOY_SOURCE: handle_eventbridge_event,
+    CODE_PIPELINE_SOURCE: handle_pipeline_event,
+}
+
+# CodePipeline events dispatched by their detail-type
+PIPELINE_EVENT_HANDLERS = {
+    STAGE_STATE_CHANGE: handle_stage_event,
+    EXECUTION_STATE_CHANGE: handle_execution_event,
+}
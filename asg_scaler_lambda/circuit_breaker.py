@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+import time
+from botocore.config import Config
+from botocore.exceptions import (
+    ClientError, ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+)
+
+# Define constants
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+THROTTLING_ERROR_CODES = ('Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequestsException')
+TRANSPORT_ERRORS = (ConnectTimeoutError, ReadTimeoutError, EndpointConnectionError, ConnectionClosedError)
+
+# Configure the logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Breakers shared across warm invocations: (service, region) -> CircuitBreaker
+_circuit_breakers = {}
+_registry_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an AWS service whose circuit is open.
+    """
+
+
+def get_client_config():
+    """
+    Returns the botocore configuration used for every AWS client, with timeouts short enough
+    that a degraded service trips the circuit breaker rather than holding the invocation.
+    """
+    return Config(
+        connect_timeout=float(os.environ.get('AWS_CONNECT_TIMEOUT', 2)),
+        read_timeout=float(os.environ.get('AWS_READ_TIMEOUT', 5)),
+        retries={'max_attempts': int(os.environ.get('AWS_MAX_ATTEMPTS', 2)), 'mode': 'standard'}
+    )
+
+
+def get_aws_region():
+    return os.environ.get('AWS_REGION', 'us-east-1')
+
+
+def is_service_failure(error):
+    """
+    Decide whether an error reflects a degraded service rather than a bad request.
+    Only throttling, 5xx responses and transport errors count towards opening the circuit; client
+    errors such as a missing ASG and local errors such as ParamValidationError do not.
+    """
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return code in THROTTLING_ERROR_CODES or status >= 500
+    return isinstance(error, TRANSPORT_ERRORS)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for a single AWS service in a single region.
+    Calls slower than slow_call_seconds count as failures. Once open, calls are rejected until
+    reset_timeout has elapsed, after which a single half-open probe decides whether to close it.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0, slow_call_seconds=5.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        """
+        :raises CircuitOpenError: If the circuit is open, or half-open with a probe already in flight
+        """
+        with self.lock:
+            if self.state == OPEN:
+                remaining = self.reset_timeout - (self.clock() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(
+                        f"{self.name} is unavailable after {self.failures} consecutive failures; "
+                        f"failing fast for another {remaining:.0f}s."
+                    )
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == HALF_OPEN:
+                if self.probe_in_flight:
+                    raise CircuitOpenError(f"{self.name} is recovering; a probe request is already in flight.")
+                self.probe_in_flight = True
+
+    def record_success(self, elapsed):
+        if elapsed > self.slow_call_seconds:
+            logger.debug(f"{self.name} call took {elapsed:.2f}s, counting as a failure.")
+            self.record_failure()
+            return
+        with self.lock:
+            if self.state != CLOSED:
+                logger.info(f"{self.name} circuit closed.")
+            self.state = CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"{self.name} circuit opened after {self.failures} consecutive failures.")
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def release_probe(self):
+        with self.lock:
+            self.probe_in_flight = False
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call func through the breaker, recording its outcome and latency.
+
+        :raises CircuitOpenError: If the circuit does not allow the call
+        """
+        self.before_call()
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_service_failure(e):
+                self.record_failure()
+            elif isinstance(e, ClientError):
+                # The service answered, so it is healthy even though the request was rejected
+                self.record_success(0)
+            else:
+                # Raised locally without reaching the service, so it says nothing about its health
+                self.release_probe()
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+
+def get_circuit_breaker(service, region=None):
+    """
+    Returns the breaker for an AWS service and region, creating it on first use so its
+    state survives across warm invocations.
+
+    :param service: The AWS service name, e.g. 'autoscaling'
+    :param region: The AWS region, defaults to AWS_REGION
+    """
+    region = region or get_aws_region()
+    with _registry_lock:
+        breaker = _circuit_breakers.get((service, region))
+        if breaker is None:
+            breaker = CircuitBreaker(
+                f"AWS {service} API in {region}",
+                failure_threshold=int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 3)),
+                reset_timeout=float(os.environ.get('CIRCUIT_RESET_TIMEOUT', 30)),
+                slow_call_seconds=float(os.environ.get('CIRCUIT_SLOW_CALL_SECONDS', 5))
+            )
+            _circuit_breakers[(service, region)] = breaker
+    return breaker
+
+
+def reset_circuit_breakers():
+    with _registry_lock:
+        _circuit_breakers.clear()
@@ -2,8 +2,11 @@ import boto3
 import json
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from asg_scaler_lambda.circuit_breaker import CircuitOpenError, get_circuit_breaker, get_client_config
 
 AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+DEFAULT_APPROVAL_CONCURRENCY = 8
 
 # Configure the logging
 logger = logging.getLogger(__name__)
@@ -13,19 +16,23 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(leve
 def get_codepipeline_client():
     """
     Returns a boto3 client for AWS CodePipeline.
-    This function can be modified to dynamically set the region or other client parameters if needed.
+    Connect and read timeouts come from get_client_config rather than the SDK defaults.
     """
-    return boto3.client('codepipeline', region_name=AWS_REGION)
+    return boto3.client('codepipeline', region_name=AWS_REGION, config=get_client_config())
 
 
-def report_job_success(job_id):
+def report_job_success(job_id, continuation_token=None):
     """
     Notify AWS CodePipeline of a successful job execution.
     :param job_id: The ID of the CodePipeline job
+    :param continuation_token: Optional token asking CodePipeline to re-invoke the job to continue it
     """
     client = get_codepipeline_client()
     try:
-        client.put_job_success_result(jobId=job_id)
+        if continuation_token:
+            client.put_job_success_result(jobId=job_id, continuationToken=continuation_token)
+        else:
+            client.put_job_success_result(jobId=job_id)
         logger.debug(f"Job {job_id} reported as success.")
     except Exception as e:
         logger.debug(f"Error reporting job success for {job_id}: {str(e)}")
@@ -48,8 +55,8 @@ def report_job_failure(job_id, message):
         logger.debug(f"Error reporting job failure for {job_id}: {str(e)}")
 
 
-def approve_action(pipeline_name, stage_name, action_name, token):
-    client = get_codepipeline_client()
+def approve_action(pipeline_name, stage_name, action_name, token, client=None):
+    client = client or get_codepipeline_client()
     try:
         response = client.put_approval_result(
             pipelineName=pipeline_name,
@@ -104,10 +111,15 @@ def get_approval_token(pipeline_name, stage_name, action_name):
     :param stage_name: The name of the stage
     :param action_name: The name of the action
     :return: The approval token if found, else None
+    :raises CircuitOpenError: If the CodePipeline circuit breaker is open
     """
     client = get_codepipeline_client()
     try:
-        pipeline_state = client.get_pipeline_state(name=pipeline_name)
+        pipeline_state = get_circuit_breaker('codepipeline', AWS_REGION).call(
+            client.get_pipeline_state, name=pipeline_name
+        )
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.debug(f"Error getting pipeline state for {pipeline_name}: {str(e)}")
         return None
@@ -138,3 +150,75 @@ def get_approval_token(pipeline_name, stage_name, action_name):
     )
 
     return None
+
+
+def get_pipeline_tokens(client, pipeline_name, actions):
+    """
+    Get the approval tokens for several actions of one pipeline with a single state fetch.
+    :param client: The CodePipeline client to use
+    :param pipeline_name: The name of the pipeline
+    :param actions: A list of (stage_name, action_name) tuples
+    :return: A dict of (stage_name, action_name) -> token, or None where no token is available
+    :raises CircuitOpenError: If the CodePipeline circuit breaker is open
+    """
+    pipeline_state = get_circuit_breaker('codepipeline', AWS_REGION).call(client.get_pipeline_state, name=pipeline_name)
+    stages = {stage['stageName']: stage for stage in pipeline_state['stageStates']}
+    tokens = {}
+    for stage_name, action_name in actions:
+        action = find_action_in_stage(stages[stage_name], action_name) if stage_name in stages else None
+        tokens[(stage_name, action_name)] = extract_token_if_available(action) if action else None
+    return tokens
+
+
+def approve_actions(approvals):
+    """
+    Approve several actions, possibly across pipelines. Pipeline state is fetched once per pipeline
+    and the approvals are submitted concurrently, so one failure does not block the others.
+    :param approvals: A list of (pipeline_name, stage_name, action_name) tuples
+    :return: A list of result dicts, one per approval in the same order, each with pipelineName,
+        stageName, actionName, statusCode and body
+    """
+    client = get_codepipeline_client()
+    by_pipeline = {}
+    for pipeline_name, stage_name, action_name in approvals:
+        by_pipeline.setdefault(pipeline_name, []).append((stage_name, action_name))
+
+    max_workers = int(os.environ.get('APPROVAL_CONCURRENCY', DEFAULT_APPROVAL_CONCURRENCY))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        state_futures = {
+            pipeline_name: executor.submit(get_pipeline_tokens, client, pipeline_name, actions)
+            for pipeline_name, actions in by_pipeline.items()
+        }
+        tokens = {}
+        for pipeline_name, future in state_futures.items():
+            try:
+                tokens[pipeline_name] = future.result()
+            except Exception as e:
+                logger.debug(f"Error getting pipeline state for {pipeline_name}: {str(e)}")
+                tokens[pipeline_name] = e
+
+        outcomes = []
+        for pipeline_name, stage_name, action_name in approvals:
+            pipeline_tokens = tokens[pipeline_name]
+            if isinstance(pipeline_tokens, Exception):
+                status = 503 if isinstance(pipeline_tokens, CircuitOpenError) else 500
+                outcomes.append({'statusCode': status, 'body': json.dumps(str(pipeline_tokens))})
+            elif pipeline_tokens[(stage_name, action_name)] is None:
+                outcomes.append({'statusCode': 400, 'body': json.dumps('Approval token not found.')})
+            else:
+                outcomes.append(executor.submit(
+                    approve_action, pipeline_name, stage_name, action_name,
+                    pipeline_tokens[(stage_name, action_name)], client
+                ))
+        outcomes = [o.result() if not isinstance(o, dict) else o for o in outcomes]
+
+    return [
+        {
+            'pipelineName': pipeline_name,
+            'stageName': stage_name,
+            'actionName': action_name,
+            'statusCode': outcome['statusCode'],
+            'body': json.loads(outcome['body'])
+        }
+        for (pipeline_name, stage_name, action_name), outcome in zip(approvals, outcomes)
+    ]
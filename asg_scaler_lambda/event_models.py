@@ -0,0 +1,257 @@
+import json
+from dataclasses import dataclass
+
+# Define constants
+CODE_PIPELINE_JOB_KEY = 'CodePipeline.job'
+CODE_DEPLOY_SOURCE = 'aws.codedeploy'
+CODE_PIPELINE_SOURCE = 'aws.codepipeline'
+STAGE_STATE_CHANGE = 'CodePipeline Stage Execution State Change'
+EXECUTION_STATE_CHANGE = 'CodePipeline Pipeline Execution State Change'
+ABANDONED_EXECUTION_STATES = ('FAILED', 'CANCELED', 'STOPPED', 'SUPERSEDED')
+
+
+class EventParseError(ValueError):
+    """
+    Raised when an incoming event cannot be parsed into its model.
+    Carries the job ID (if known) so the caller can report the failure back to CodePipeline.
+    """
+
+    def __init__(self, message, job_id=None):
+        super().__init__(message)
+        self.job_id = job_id
+
+
+@dataclass
+class AsgTarget:
+    """
+    The Auto Scaling Group and capacities a CodePipeline job asks for.
+    Capacities are kept as supplied; update_asg is responsible for converting and validating them.
+    """
+    __slots__ = ('asg_name', 'min_capacity', 'desired_capacity', 'max_capacity', 'desired_capacity_type')
+    asg_name: str
+    min_capacity: object
+    desired_capacity: object
+    max_capacity: object
+    desired_capacity_type: str
+
+    def as_args(self):
+        """
+        :return: The target as positional arguments for update_asg
+        """
+        return self.asg_name, self.min_capacity, self.desired_capacity, self.max_capacity
+
+    def as_kwargs(self):
+        """
+        :return: The optional target settings as keyword arguments for update_asg
+        """
+        return {'desired_capacity_type': self.desired_capacity_type} if self.desired_capacity_type else {}
+
+
+@dataclass
+class CodePipelineJob:
+    """
+    A CodePipeline job invocation together with its decoded UserParameters.
+    continuation_token is set when CodePipeline re-invokes a job that asked to be continued.
+    """
+    __slots__ = ('job_id', 'user_parameters', 'continuation_token')
+    job_id: str
+    user_parameters: dict
+    continuation_token: str
+
+
+@dataclass
+class ApprovalTarget:
+    """
+    A CodePipeline manual approval action to approve once a deployment succeeds.
+    """
+    __slots__ = ('pipeline_name', 'stage_name', 'action_name')
+    pipeline_name: str
+    stage_name: str
+    action_name: str
+
+    def as_args(self):
+        return self.pipeline_name, self.stage_name, self.action_name
+
+
+@dataclass
+class CodeDeployStateChange:
+    """
+    A CodeDeploy deployment state-change event routed to the Lambda by EventBridge.
+    approvals holds every approval action named by the event, either as a single
+    pipelineName/stageName/actionName or as an 'approvals' list.
+    """
+    __slots__ = (
+        'state', 'pipeline_name', 'stage_name', 'action_name', 'execution_id',
+        'application', 'deployment_group', 'approvals'
+    )
+    state: str
+    pipeline_name: str
+    stage_name: str
+    action_name: str
+    execution_id: str
+    application: str
+    deployment_group: str
+    approvals: list
+
+    @property
+    def succeeded(self):
+        return self.state == 'SUCCESS'
+
+
+@dataclass
+class StageStateChange:
+    """
+    A CodePipeline stage execution state-change event routed to the Lambda by EventBridge.
+    """
+    __slots__ = ('pipeline_name', 'execution_id', 'stage_name', 'state')
+    pipeline_name: str
+    execution_id: str
+    stage_name: str
+    state: str
+
+    @property
+    def started(self):
+        return self.state == 'STARTED'
+
+    @property
+    def succeeded(self):
+        return self.state == 'SUCCEEDED'
+
+
+@dataclass
+class ExecutionStateChange:
+    """
+    A CodePipeline pipeline execution state-change event routed to the Lambda by EventBridge.
+    """
+    __slots__ = ('pipeline_name', 'execution_id', 'state')
+    pipeline_name: str
+    execution_id: str
+    state: str
+
+    @property
+    def abandoned(self):
+        return self.state in ABANDONED_EXECUTION_STATES
+
+
+def get_event_source(event):
+    """
+    Resolve the key used to dispatch an incoming event.
+    CodePipeline job invocations carry no 'source' field, so they are identified by their job key.
+
+    :param event: The raw Lambda event
+    :return: The event source key, or None if it cannot be determined
+    """
+    if CODE_PIPELINE_JOB_KEY in event:
+        return CODE_PIPELINE_JOB_KEY
+    return event.get('source')
+
+
+def parse_codepipeline_job(event):
+    """
+    Parse a CodePipeline job event, decoding its UserParameters JSON exactly once.
+
+    :param event: The raw Lambda event
+    :return: A CodePipelineJob
+    :raises EventParseError: If the UserParameters are not a valid JSON object
+    """
+    job = event.get(CODE_PIPELINE_JOB_KEY) or {}
+    job_id = job.get('id')
+    configuration = job.get('data', {}).get('actionConfiguration', {}).get('configuration', {})
+
+    try:
+        user_parameters = json.loads(configuration.get('UserParameters', '{}'))
+    except (TypeError, json.JSONDecodeError):
+        raise EventParseError('Invalid UserParameters format.', job_id)
+    if not isinstance(user_parameters, dict):
+        raise EventParseError('Invalid UserParameters format.', job_id)
+
+    return CodePipelineJob(job_id, user_parameters, job.get('data', {}).get('continuationToken'))
+
+
+def parse_asg_target(job):
+    """
+    Build the ASG target from a parsed CodePipeline job.
+    Only presence is checked here, so a legitimate capacity of 0 is accepted.
+
+    :param job: A CodePipelineJob
+    :return: An AsgTarget
+    :raises EventParseError: If any required parameter is missing
+    """
+    params = job.user_parameters
+    target = AsgTarget(
+        params.get('asgName'),
+        params.get('minCapacity'),
+        params.get('desiredCapacity'),
+        params.get('maxCapacity'),
+        params.get('desiredCapacityType')
+    )
+    if not target.asg_name or any(x is None for x in target.as_args()):
+        raise EventParseError('Missing required parameters.', job.job_id)
+    return target
+
+
+def parse_codedeploy_state_change(event):
+    """
+    Parse a CodeDeploy state-change event.
+
+    :param event: The raw Lambda event
+    :return: A CodeDeployStateChange
+    """
+    detail = event.get('detail') or {}
+    approvals = parse_approval_targets(event.get('approvals') or [])
+    if event.get('pipelineName'):
+        approvals.insert(0, ApprovalTarget(event['pipelineName'], event.get('stageName'), event.get('actionName')))
+    return CodeDeployStateChange(
+        detail.get('state'),
+        event.get('pipelineName'),
+        event.get('stageName'),
+        event.get('actionName'),
+        event.get('executionId'),
+        detail.get('application'),
+        detail.get('deploymentGroup'),
+        approvals
+    )
+
+
+def parse_approval_targets(items):
+    """
+    Parse a list of {"pipelineName", "stageName", "actionName"} objects.
+
+    :param items: The raw approval action objects
+    :return: A list of ApprovalTarget, skipping entries without a pipeline name
+    """
+    return [
+        ApprovalTarget(item.get('pipelineName'), item.get('stageName'), item.get('actionName'))
+        for item in items if isinstance(item, dict) and item.get('pipelineName')
+    ]
+
+
+def parse_stage_state_change(event):
+    """
+    Parse a CodePipeline stage execution state-change event.
+
+    :param event: The raw Lambda event
+    :return: A StageStateChange, or None if the event is another CodePipeline event type
+    """
+    if event.get('detail-type') != STAGE_STATE_CHANGE:
+        return None
+    detail = event.get('detail') or {}
+    return StageStateChange(
+        detail.get('pipeline'),
+        detail.get('execution-id'),
+        detail.get('stage'),
+        detail.get('state')
+    )
+
+
+def parse_execution_state_change(event):
+    """
+    Parse a CodePipeline pipeline execution state-change event.
+
+    :param event: The raw Lambda event
+    :return: An ExecutionStateChange, or None if the event is another CodePipeline event type
+    """
+    if event.get('detail-type') != EXECUTION_STATE_CHANGE:
+        return None
+    detail = event.get('detail') or {}
+    return ExecutionStateChange(detail.get('pipeline'), detail.get('execution-id'), detail.get('state'))
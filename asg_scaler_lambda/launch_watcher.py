@@ -0,0 +1,204 @@
+import boto3
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from asg_scaler_lambda.asg_helper import apply_instance_type_fallback
+from asg_scaler_lambda.circuit_breaker import get_circuit_breaker, get_client_config
+
+# Define constants
+WATCHING = 'watching'
+LAUNCHED = 'launched'
+FAILED = 'failed'
+FAILED_STATUS_CODES = ('Failed', 'Cancelled')
+TERMINAL_STATUS_CODES = ('Successful',) + FAILED_STATUS_CODES
+DEFAULT_WATCH_TIMEOUT = 600
+DEFAULT_FALLBACK_AFTER_FAILURES = 2
+WATCH_SINCE_SLACK = 10
+DEFAULT_PRESCALE_LOOKBACK = 900
+
+# Configure the logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+@dataclass
+class WatchResult:
+    """
+    The outcome of one check of an ASG's launch activities.
+    While status is WATCHING, continuation_token must be handed back to CodePipeline so the job is re-invoked.
+    """
+    __slots__ = ('status', 'message', 'continuation_token')
+    status: str
+    message: str
+    continuation_token: str
+
+
+def watch_enabled(user_parameters):
+    """
+    Launch watching is enabled per job with "watchLaunches": true, or for every job with WATCH_LAUNCHES=true.
+    """
+    if 'watchLaunches' in user_parameters:
+        return bool(user_parameters['watchLaunches'])
+    return os.environ.get('WATCH_LAUNCHES', '').lower() == 'true'
+
+
+def get_launch_activities(asg_name, since):
+    """
+    Describe the ASG's launch activities that started at or after a point in time.
+
+    :param asg_name: The name of the Auto Scaling Group
+    :param since: Epoch seconds from which to include activities
+    :return: A list of activity dicts, newest first
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    client = boto3.client('autoscaling', config=get_client_config())
+    response = get_circuit_breaker('autoscaling').call(
+        client.describe_scaling_activities, AutoScalingGroupName=asg_name, MaxRecords=50
+    )
+    return [
+        activity for activity in response.get('Activities', [])
+        if activity.get('Description', '').startswith('Launching')
+        and activity['StartTime'].timestamp() >= since
+    ]
+
+
+def get_in_service_capacity(asg_name):
+    """
+    Describe how much of the ASG's desired capacity is InService.
+
+    :param asg_name: The name of the Auto Scaling Group
+    :return: A tuple (in_service, desired), counting each instance by its weighted capacity
+    :raises ValueError: If the ASG is not found
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    client = boto3.client('autoscaling', config=get_client_config())
+    groups = get_circuit_breaker('autoscaling').call(
+        client.describe_auto_scaling_groups, AutoScalingGroupNames=[asg_name]
+    )['AutoScalingGroups']
+    if not groups:
+        raise ValueError(f"ASG '{asg_name}' not found.")
+    in_service = sum(
+        int(instance.get('WeightedCapacity') or 1)
+        for instance in groups[0].get('Instances', []) if instance.get('LifecycleState') == 'InService'
+    )
+    return in_service, groups[0]['DesiredCapacity']
+
+
+def get_prescale_since(prescale_record, now=None):
+    """
+    :param prescale_record: The ASG's pre-scale record, or None if it was pre-scaled without one
+    :return: The epoch seconds from which to watch an ASG that an earlier stage already pre-scaled: the
+        recorded pre-scale time, or PRESCALE_WATCH_LOOKBACK seconds ago when there is no record
+    """
+    if prescale_record and prescale_record.get('at') is not None:
+        return float(prescale_record['at'])
+    now = time.time() if now is None else now
+    return now - float(os.environ.get('PRESCALE_WATCH_LOOKBACK', DEFAULT_PRESCALE_LOOKBACK))
+
+
+def is_superseded(activity, activities):
+    """
+    :return: True if a launch activity that started later has succeeded, e.g. AWS retried a failed launch
+    """
+    return any(
+        other.get('StatusCode') == 'Successful' and other['StartTime'] > activity['StartTime']
+        for other in activities
+    )
+
+
+def start_watch(asg_name, user_parameters, since, now=None, prescaled=False):
+    """
+    Begin watching an ASG after it was updated.
+
+    :param asg_name: The name of the Auto Scaling Group
+    :param user_parameters: The job's resolved UserParameters
+    :param since: Epoch seconds captured before the ASG was updated; activities from
+        WATCH_SINCE_SLACK seconds earlier are included to allow for clock skew
+    :param prescaled: True if an earlier stage pre-scaled the ASG rather than this job
+    :return: A WATCHING WatchResult whose token records the watch window
+    """
+    now = time.time() if now is None else now
+    timeout = float(user_parameters.get('watchTimeout', DEFAULT_WATCH_TIMEOUT))
+    state = {
+        'asg': asg_name, 'since': since - WATCH_SINCE_SLACK, 'deadline': now + timeout, 'seen': [], 'fallback': False
+    }
+    if prescaled:
+        state['prescaled'] = True
+    return WatchResult(WATCHING, f"Watching launch activities of ASG '{asg_name}'.", json.dumps(state))
+
+
+def check_watch(continuation_token, user_parameters, now=None):
+    """
+    Check the launch activities recorded in a continuation token.
+    Any failed or cancelled launch fails the watch immediately, unless a later launch succeeded or
+    fallbackInstanceTypes are configured, in which case fallbackAfterFailures failures first switch
+    the ASG to them. The launch is confirmed once a launch activity has succeeded with none pending,
+    or once the ASG's InService capacity reaches its desired capacity; a pre-scaled ASG whose capacity
+    is already InService is confirmed before its activities are looked at. If neither happens by the
+    deadline the watch fails.
+
+    :param continuation_token: The token returned by start_watch or a previous check_watch
+    :param user_parameters: The job's resolved UserParameters
+    :return: A WatchResult
+    :raises ValueError: If the token is malformed or the fallback cannot be applied
+    :raises CircuitOpenError: If the AutoScaling circuit breaker is open
+    """
+    now = time.time() if now is None else now
+    try:
+        state = json.loads(continuation_token)
+        asg_name = state['asg']
+    except (TypeError, KeyError, json.JSONDecodeError):
+        raise ValueError('Invalid continuation token.')
+
+    capacity = None
+    if state.get('prescaled'):
+        # An InService pre-scaled fleet is launched, whatever activities it went through to get there
+        capacity = get_in_service_capacity(asg_name)
+        if capacity[0] >= capacity[1]:
+            return WatchResult(
+                LAUNCHED, f"ASG '{asg_name}' has {capacity[0]} of {capacity[1]} capacity InService.", None
+            )
+
+    activities = get_launch_activities(asg_name, state['since'])
+    seen = state.get('seen', [])
+    failed = [
+        a for a in activities
+        if a.get('StatusCode') in FAILED_STATUS_CODES and a['ActivityId'] not in seen
+        and not is_superseded(a, activities)
+    ]
+    pending = [a for a in activities if a.get('StatusCode') not in TERMINAL_STATUS_CODES]
+
+    if failed:
+        fallback_types = user_parameters.get('fallbackInstanceTypes') or []
+        threshold = int(user_parameters.get('fallbackAfterFailures', DEFAULT_FALLBACK_AFTER_FAILURES))
+        status_message = failed[0].get('StatusMessage') or failed[0].get('StatusCode')
+        if not fallback_types or state['fallback']:
+            return WatchResult(FAILED, f"Launch failed for ASG '{asg_name}': {status_message}", None)
+        state['seen'] = seen + [a['ActivityId'] for a in failed]
+        if len(state['seen']) >= threshold:
+            apply_instance_type_fallback(asg_name, fallback_types)
+            logger.warning(f"Falling back to instance types {fallback_types} for ASG '{asg_name}'.")
+            state['fallback'] = True
+        return WatchResult(WATCHING, f"Retrying launches for ASG '{asg_name}': {status_message}", json.dumps(state))
+
+    if pending:
+        if now >= state['deadline']:
+            return WatchResult(
+                FAILED, f"Timed out watching ASG '{asg_name}' with {len(pending)} launches pending.", None
+            )
+        return WatchResult(
+            WATCHING, f"{len(pending)} launch activities pending for ASG '{asg_name}'.", json.dumps(state)
+        )
+
+    if any(a.get('StatusCode') == 'Successful' for a in activities):
+        return WatchResult(LAUNCHED, f"All launch activities for ASG '{asg_name}' succeeded.", None)
+    in_service, desired = capacity or get_in_service_capacity(asg_name)
+    if in_service >= desired:
+        return WatchResult(LAUNCHED, f"ASG '{asg_name}' has {in_service} of {desired} capacity InService.", None)
+    if now >= state['deadline']:
+        return WatchResult(
+            FAILED, f"No launch activity seen for ASG '{asg_name}'; {in_service} of {desired} capacity InService.", None
+        )
+    return WatchResult(WATCHING, f"Waiting for launch activities of ASG '{asg_name}'.", json.dumps(state))
@@ -0,0 +1,158 @@
+import boto3
+import json
+import logging
+import os
+import time
+from asg_scaler_lambda.circuit_breaker import get_client_config
+
+AWS_REGION = os.environ.get('AWS_REGION', 'us-east-1')
+
+# Define constants
+PROFILE_KEY = 'profile'
+DEFAULT_PROFILE_PREFIX = '/asg-scaler/profiles/'
+DEFAULT_PROFILE_CACHE_TTL = 300
+SSM_GET_PARAMETERS_LIMIT = 10
+
+# Configure the logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Profiles cached across warm invocations: name -> (profile, fetched_at)
+_profile_cache = {}
+
+
+class ProfileError(ValueError):
+    """
+    Raised when a deployment profile cannot be found or decoded.
+    """
+
+
+def get_ssm_client():
+    """
+    Returns a boto3 client for AWS Systems Manager.
+    """
+    return boto3.client('ssm', region_name=AWS_REGION, config=get_client_config())
+
+
+def get_profile_cache_ttl():
+    return int(os.environ.get('PROFILE_CACHE_TTL', DEFAULT_PROFILE_CACHE_TTL))
+
+
+def clear_profile_cache():
+    _profile_cache.clear()
+
+
+def decode_profile(name, value):
+    try:
+        profile = json.loads(value) if isinstance(value, str) else value
+    except json.JSONDecodeError:
+        raise ProfileError(f"Profile '{name}' is not valid JSON.")
+    if not isinstance(profile, dict):
+        raise ProfileError(f"Profile '{name}' must be a JSON object.")
+    return profile
+
+
+def fetch_ssm_profiles(names):
+    """
+    Fetch profiles from SSM Parameter Store with as few GetParameters calls as possible.
+    Each profile is stored as a JSON string under PROFILE_PREFIX + name.
+
+    :param names: The profile names to fetch
+    :return: A dict of name -> profile for every profile found
+    """
+    prefix = os.environ.get('PROFILE_PREFIX', DEFAULT_PROFILE_PREFIX)
+    client = get_ssm_client()
+    found = {}
+    for i in range(0, len(names), SSM_GET_PARAMETERS_LIMIT):
+        batch = {prefix + name: name for name in names[i:i + SSM_GET_PARAMETERS_LIMIT]}
+        response = client.get_parameters(Names=list(batch), WithDecryption=True)
+        for parameter in response.get('Parameters', []):
+            name = batch[parameter['Name']]
+            found[name] = decode_profile(name, parameter['Value'])
+        for missing in response.get('InvalidParameters', []):
+            logger.debug(f"Profile parameter {missing} not found in SSM.")
+    return found
+
+
+def fetch_file_profiles(names):
+    """
+    Fetch profiles from a local JSON file mapping profile names to profiles.
+
+    :param names: The profile names to fetch
+    :return: A dict of name -> profile for every profile found
+    """
+    path = os.environ.get('PROFILE_FILE', 'profiles.json')
+    try:
+        with open(path) as f:
+            profiles = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ProfileError(f"Unable to read profile file '{path}': {e}")
+    if not isinstance(profiles, dict):
+        raise ProfileError(f"Profile file '{path}' must contain a JSON object.")
+    return {name: decode_profile(name, profiles[name]) for name in names if name in profiles}
+
+
+PROFILE_BACKENDS = {
+    'ssm': fetch_ssm_profiles,
+    'file': fetch_file_profiles,
+}
+
+
+def get_profiles(names):
+    """
+    Resolve deployment profiles by name, fetching only those missing from or expired in the cache.
+    All stale profiles are fetched in a single batched backend call. The cache is TTL-only: an
+    expired profile is always refetched in full, and one the backend no longer returns is evicted.
+
+    :param names: The profile names to resolve
+    :return: A dict of name -> profile
+    :raises ProfileError: If the backend is unknown, the lookup fails or a profile does not exist
+    """
+    backend_name = os.environ.get('PROFILE_BACKEND', 'ssm')
+    backend = PROFILE_BACKENDS.get(backend_name)
+    if backend is None:
+        raise ProfileError(f"Unknown profile backend '{backend_name}'.")
+
+    now = time.monotonic()
+    ttl = get_profile_cache_ttl()
+    stale = [
+        name for name in dict.fromkeys(names)
+        if name not in _profile_cache or now - _profile_cache[name][1] >= ttl
+    ]
+
+    if stale:
+        try:
+            fetched = backend(stale)
+        except ProfileError:
+            raise
+        except Exception as e:
+            raise ProfileError(f"Failed to fetch profiles {stale}: {e}")
+        for name in stale:
+            if name in fetched:
+                _profile_cache[name] = (fetched[name], now)
+                logger.debug(f"Loaded profile '{name}'.")
+            else:
+                _profile_cache.pop(name, None)
+
+    missing = [name for name in names if name not in _profile_cache]
+    if missing:
+        raise ProfileError(f"Profile not found: {', '.join(missing)}.")
+    return {name: _profile_cache[name][0] for name in names}
+
+
+def resolve_user_parameters(user_parameters):
+    """
+    Expand a profile reference in UserParameters. Keys given inline take precedence over the profile.
+
+    :param user_parameters: The decoded UserParameters
+    :return: The UserParameters merged with the referenced profile, or unchanged if none is referenced
+    :raises ProfileError: If the profile name is invalid or the profile cannot be resolved
+    """
+    if PROFILE_KEY not in user_parameters:
+        return user_parameters
+    name = user_parameters[PROFILE_KEY]
+    if not isinstance(name, str) or not name:
+        raise ProfileError('Profile name must be a non-empty string.')
+    resolved = dict(get_profiles([name])[name])
+    resolved.update({k: v for k, v in user_parameters.items() if k != PROFILE_KEY})
+    return resolved
@@ -0,0 +1,91 @@
+import json
+import os
+
+
+class ConfigError(ValueError):
+    """
+    Raised when routing configuration held in an environment variable is malformed.
+    """
+
+
+def load_json_env(name):
+    """
+    Load a JSON object from an environment variable.
+
+    :param name: The environment variable to read
+    :return: The decoded object, or an empty dict if the variable is unset
+    :raises ConfigError: If the value is not a JSON object
+    """
+    try:
+        value = json.loads(os.environ.get(name, '{}'))
+    except json.JSONDecodeError:
+        raise ConfigError(f"{name} is not valid JSON.")
+    if not isinstance(value, dict):
+        raise ConfigError(f"{name} must be a JSON object.")
+    return value
+
+
+def get_prescale_profiles(pipeline_name, stage_name):
+    """
+    Look up the profiles to pre-scale when a pipeline stage starts.
+    Triggers are configured in PRESCALE_TRIGGERS as JSON, e.g.
+    {"my-pipeline": {"Build": ["web-prod-bluegreen"]}}.
+
+    :param pipeline_name: The name of the pipeline
+    :param stage_name: The name of the stage that started
+    :return: A list of profile names, empty if the stage is not a trigger
+    :raises ConfigError: If PRESCALE_TRIGGERS is malformed
+    """
+    stages = load_json_env('PRESCALE_TRIGGERS').get(pipeline_name, {})
+    if not isinstance(stages, dict):
+        raise ConfigError(f"PRESCALE_TRIGGERS entry for pipeline '{pipeline_name}' must be a JSON object of stages.")
+    names = stages.get(stage_name, [])
+    if isinstance(names, str):
+        names = [names]
+    if not isinstance(names, list) or not all(isinstance(name, str) and name for name in names):
+        raise ConfigError(
+            f"PRESCALE_TRIGGERS entry for stage '{stage_name}' of pipeline '{pipeline_name}' "
+            f"must be a profile name or a list of profile names."
+        )
+    return names
+
+
+def get_pipeline_prescale_profiles(pipeline_name):
+    """
+    Look up every profile that any stage of a pipeline pre-scales.
+
+    :param pipeline_name: The name of the pipeline
+    :return: A list of distinct profile names, empty if the pipeline has no triggers
+    :raises ConfigError: If PRESCALE_TRIGGERS is malformed
+    """
+    stages = load_json_env('PRESCALE_TRIGGERS').get(pipeline_name, {})
+    if not isinstance(stages, dict):
+        raise ConfigError(f"PRESCALE_TRIGGERS entry for pipeline '{pipeline_name}' must be a JSON object of stages.")
+    names = [name for stage_name in stages for name in get_prescale_profiles(pipeline_name, stage_name)]
+    return list(dict.fromkeys(names))
+
+
+def get_configured_approvals(application, deployment_group):
+    """
+    Look up the approval actions gated by a CodeDeploy deployment group.
+    Configured in APPROVAL_TARGETS as JSON, e.g.
+    {"my-app/my-group": [{"pipelineName": "p", "stageName": "s", "actionName": "a"}]}.
+
+    :param application: The CodeDeploy application name
+    :param deployment_group: The CodeDeploy deployment group name
+    :return: A list of raw approval action objects, empty if none are configured
+    :raises ConfigError: If APPROVAL_TARGETS is malformed
+    """
+    key = f"{application}/{deployment_group}"
+    targets = load_json_env('APPROVAL_TARGETS').get(key, [])
+    if not isinstance(targets, list) or not all(
+        isinstance(target, dict)
+        and all(isinstance(target.get(field), str) and target[field]
+                for field in ('pipelineName', 'stageName', 'actionName'))
+        for target in targets
+    ):
+        raise ConfigError(
+            f"APPROVAL_TARGETS entry for '{key}' must be a list of objects with "
+            f"pipelineName, stageName and actionName."
+        )
+    return targets
@@ -0,0 +1,220 @@
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+
+# Define constants
+DEFAULT_TIMELINE_DB = '/tmp/asg-scaler-timeline.db'
+DEFAULT_PERCENTILES = (50, 90, 99)
+WINDOW_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+STAGE_STARTED_PREFIX = 'stage-started:'
+STAGE_PREFIX = 'stage:'
+
+# Configure the logging
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Store shared across warm invocations, created on first use
+_timeline_store = None
+
+
+@dataclass
+class PhaseEvent:
+    """
+    A timestamped marker recorded when a deployment phase completes.
+    The duration of a phase is the time elapsed since the previous event of the same pipeline execution,
+    except for pipeline stages: 'stage-started:<name>' only marks a stage starting, and the duration of
+    'stage:<name>' runs from that start to the stage succeeding.
+    """
+    __slots__ = ('pipeline_name', 'execution_id', 'asg_name', 'phase', 'timestamp')
+    pipeline_name: str
+    execution_id: str
+    asg_name: str
+    phase: str
+    timestamp: float
+
+
+class SqliteTimelineStore:
+    """
+    Timeline store backed by a local SQLite database.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS phase_events ('
+            'pipeline_name TEXT, execution_id TEXT, asg_name TEXT, phase TEXT NOT NULL, timestamp REAL NOT NULL)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS phase_events_timestamp ON phase_events (timestamp)'
+        )
+        self.connection.commit()
+
+    def record(self, event):
+        self.connection.execute(
+            'INSERT INTO phase_events VALUES (?, ?, ?, ?, ?)',
+            (event.pipeline_name, event.execution_id, event.asg_name, event.phase, event.timestamp)
+        )
+        self.connection.commit()
+
+    def events_since(self, since):
+        rows = self.connection.execute(
+            'SELECT pipeline_name, execution_id, asg_name, phase, timestamp FROM phase_events '
+            'WHERE timestamp >= ? ORDER BY pipeline_name, execution_id, timestamp',
+            (since,)
+        )
+        return [PhaseEvent(*row) for row in rows]
+
+
+TIMELINE_STORES = {
+    'sqlite': lambda: SqliteTimelineStore(os.environ.get('TIMELINE_DB', DEFAULT_TIMELINE_DB)),
+}
+
+
+def get_timeline_store():
+    """
+    Returns the timeline store selected by TIMELINE_BACKEND, or None when recording is disabled.
+    """
+    global _timeline_store
+    if _timeline_store is None:
+        factory = TIMELINE_STORES.get(os.environ.get('TIMELINE_BACKEND', ''))
+        if factory is not None:
+            _timeline_store = factory()
+    return _timeline_store
+
+
+def reset_timeline_store():
+    global _timeline_store
+    _timeline_store = None
+
+
+def record_phase(pipeline_name, execution_id, asg_name, phase):
+    """
+    Record that a deployment phase completed now. Recording never interrupts the caller.
+
+    :param pipeline_name: The name of the pipeline, if known
+    :param execution_id: The pipeline execution ID, if known
+    :param asg_name: The name of the ASG involved, if any
+    :param phase: The name of the phase that completed
+    """
+    try:
+        store = get_timeline_store()
+        if store is not None:
+            store.record(PhaseEvent(pipeline_name, execution_id, asg_name, phase, time.time()))
+    except Exception as e:
+        logger.debug(f"Failed to record phase {phase} for pipeline {pipeline_name}: {e}")
+
+
+def phase_durations(events):
+    """
+    Convert recorded events into phase durations.
+
+    :param events: PhaseEvents ordered by pipeline, execution and timestamp
+    :return: A dict of (pipeline_name, phase) -> list of durations in seconds
+    """
+    durations = {}
+    previous = None
+    stage_starts = {}
+    for event in events:
+        if event.execution_id is None:
+            previous = None
+            continue
+        same_execution = previous is not None and \
+            (previous.pipeline_name, previous.execution_id) == (event.pipeline_name, event.execution_id)
+        if not same_execution:
+            stage_starts = {}
+        key = (event.pipeline_name, event.phase)
+        if event.phase.startswith(STAGE_STARTED_PREFIX):
+            stage_starts[event.phase[len(STAGE_STARTED_PREFIX):]] = event.timestamp
+        elif event.phase.startswith(STAGE_PREFIX):
+            # A stage whose start fell outside the window has no duration
+            started = stage_starts.pop(event.phase[len(STAGE_PREFIX):], None)
+            if started is not None:
+                durations.setdefault(key, []).append(event.timestamp - started)
+        elif same_execution:
+            durations.setdefault(key, []).append(event.timestamp - previous.timestamp)
+        previous = event
+    return durations
+
+
+def percentile(values, pct):
+    """
+    Linearly interpolated percentile of a non-empty list of values.
+    """
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def parse_window(window):
+    """
+    Parse a time window such as '90m' or '7d' into seconds.
+
+    :raises ValueError: If the window is not a positive number followed by s, m, h or d
+    """
+    try:
+        seconds = float(window[:-1]) * WINDOW_UNITS[window[-1]]
+    except (KeyError, ValueError, IndexError):
+        raise ValueError(f"Invalid time window '{window}'.")
+    if seconds <= 0:
+        raise ValueError(f"Invalid time window '{window}'.")
+    return seconds
+
+
+def build_report(store, window_seconds, percentiles=DEFAULT_PERCENTILES, now=None):
+    """
+    Aggregate phase durations per pipeline and phase over a time window.
+
+    :param store: The timeline store to read from
+    :param window_seconds: How far back to look
+    :param percentiles: The percentiles to compute
+    :param now: The end of the window, defaults to the current time
+    :return: A list of rows (pipeline_name, phase, count, {pct: seconds})
+    """
+    now = time.time() if now is None else now
+    durations = phase_durations(store.events_since(now - window_seconds))
+    return [
+        (pipeline_name, phase, len(values), {pct: percentile(values, pct) for pct in percentiles})
+        for (pipeline_name, phase), values in sorted(durations.items(), key=lambda item: str(item[0]))
+    ]
+
+
+def format_report(rows, percentiles=DEFAULT_PERCENTILES):
+    header = ['pipeline', 'phase', 'count'] + [f"p{pct}" for pct in percentiles]
+    lines = ['\t'.join(header)]
+    for pipeline_name, phase, count, values in rows:
+        lines.append('\t'.join(
+            [str(pipeline_name), phase, str(count)] + [f"{values[pct]:.1f}s" for pct in percentiles]
+        ))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report deployment phase durations recorded by asg-scaler.')
+    parser.add_argument('--db', default=os.environ.get('TIMELINE_DB', DEFAULT_TIMELINE_DB),
+                        help='Path to the SQLite timeline database')
+    parser.add_argument('--window', default='7d', help='Time window to report on, e.g. 90m, 24h or 7d')
+    parser.add_argument('--percentiles', default=','.join(str(p) for p in DEFAULT_PERCENTILES),
+                        help='Comma separated percentiles to compute')
+    args = parser.parse_args(argv)
+
+    try:
+        window_seconds = parse_window(args.window)
+        percentiles = tuple(float(p) if '.' in p else int(p) for p in args.percentiles.split(','))
+    except ValueError as e:
+        parser.error(str(e))
+    if not all(0 <= pct <= 100 for pct in percentiles):
+        parser.error(f"Percentiles must be between 0 and 100: {args.percentiles}")
+
+    rows = build_report(SqliteTimelineStore(args.db), window_seconds, percentiles)
+    print(format_report(rows, percentiles))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
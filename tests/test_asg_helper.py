@@ -1,5 +1,11 @@
-from asg_scaler_lambda.asg_helper import validate_capacities, update_asg
+from asg_scaler_lambda.asg_helper import (
+    validate_capacities, update_asg, asg_at_capacity,
+    validate_capacity_type, get_mixed_instances_policy, clear_policy_cache, apply_instance_type_fallback,
+    record_prescale, take_over_prescale, restore_prescaled_capacity
+)
+from asg_scaler_lambda.circuit_breaker import CircuitOpenError
 from unittest.mock import patch
+import json
 import pytest
 
 ###########################################
@@ -104,3 +110,319 @@ def test_update_asg_equal(mock_boto3_client):
     max_capacity = "3"
     success_message = update_asg(asg_name, min_capacity, desired_capacity, max_capacity)
     assert success_message == "Successfully updated ASG 'my-asg' settings: Min=3, Desired=3, Max=3."
+
+###########################################
+# asg_at_capacity unit tests
+###########################################
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_asg_at_capacity_match(mock_boto3_client):
+    mock_boto3_client.return_value.describe_auto_scaling_groups.return_value = {
+        'AutoScalingGroups': [{'MinSize': 1, 'DesiredCapacity': 2, 'MaxSize': 3}]
+    }
+    assert asg_at_capacity("my-asg", "1", "2", "3")
+    mock_boto3_client.return_value.describe_auto_scaling_groups.assert_called_once_with(
+        AutoScalingGroupNames=["my-asg"]
+    )
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_asg_at_capacity_mismatch(mock_boto3_client):
+    mock_boto3_client.return_value.describe_auto_scaling_groups.return_value = {
+        'AutoScalingGroups': [{'MinSize': 1, 'DesiredCapacity': 1, 'MaxSize': 3}]
+    }
+    assert not asg_at_capacity("my-asg", 1, 2, 3)
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_asg_at_capacity_api_exception(mock_boto3_client):
+    mock_boto3_client.return_value.describe_auto_scaling_groups.side_effect = Exception("AWS service exception")
+    assert not asg_at_capacity("my-asg", 1, 2, 3)
+
+
+@patch('asg_scaler_lambda.asg_helper.get_circuit_breaker')
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_update_asg_circuit_open(mock_boto3_client, mock_get_circuit_breaker):
+    mock_get_circuit_breaker.return_value.call.side_effect = CircuitOpenError("AWS autoscaling API is unavailable")
+
+    with pytest.raises(CircuitOpenError):
+        update_asg("my-asg", "1", "2", "3")
+    mock_boto3_client.return_value.update_auto_scaling_group.assert_not_called()
+
+###########################################
+# Capacity type unit tests
+###########################################
+
+
+WEIGHTED_POLICY = {
+    'LaunchTemplate': {
+        'Overrides': [
+            {'InstanceType': 'm5.large', 'WeightedCapacity': '2'},
+            {'InstanceType': 'm5.xlarge', 'WeightedCapacity': '4'},
+        ]
+    }
+}
+
+ATTRIBUTE_POLICY = {
+    'LaunchTemplate': {
+        'Overrides': [{'InstanceRequirements': {'VCpuCount': {'Min': 2}, 'MemoryMiB': {'Min': 4096}}}]
+    }
+}
+
+
+@pytest.fixture
+def empty_policy_cache():
+    clear_policy_cache()
+    yield
+    clear_policy_cache()
+
+
+def test_validate_capacity_type_invalid():
+    success, error_message = validate_capacity_type("cores", 2, None)
+    assert not success
+    assert error_message == "Invalid DesiredCapacityType 'cores': must be one of units, vcpu, memory-mib."
+
+
+def test_validate_capacity_type_weighted_units():
+    assert validate_capacity_type("units", 4, WEIGHTED_POLICY) == (True, "")
+    assert validate_capacity_type("units", 0, WEIGHTED_POLICY) == (True, "")
+    success, error_message = validate_capacity_type("units", 1, WEIGHTED_POLICY)
+    assert not success
+    assert error_message == "Desired capacity 1 is smaller than the smallest instance weight 2."
+
+
+def test_validate_capacity_type_vcpu_requires_instance_requirements():
+    assert validate_capacity_type("vcpu", 8, ATTRIBUTE_POLICY) == (True, "")
+    success, error_message = validate_capacity_type("memory-mib", 8192, WEIGHTED_POLICY)
+    assert not success
+    assert error_message == "DesiredCapacityType 'memory-mib' requires attribute-based instance selection."
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_update_asg_capacity_type(mock_boto3_client, empty_policy_cache):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = {
+        'AutoScalingGroups': [{'MixedInstancesPolicy': ATTRIBUTE_POLICY}]
+    }
+
+    success_message = update_asg("my-asg", "0", "8", "16", desired_capacity_type="vcpu")
+
+    assert success_message == "Successfully updated ASG 'my-asg' settings: Min=0, Desired=8, Max=16 (vcpu)."
+    mock_client.update_auto_scaling_group.assert_called_once_with(
+        AutoScalingGroupName="my-asg", MinSize=0, MaxSize=16, DesiredCapacity=8, DesiredCapacityType="vcpu"
+    )
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_update_asg_capacity_type_below_weight(mock_boto3_client, empty_policy_cache):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = {
+        'AutoScalingGroups': [{'MixedInstancesPolicy': WEIGHTED_POLICY}]
+    }
+
+    with pytest.raises(ValueError) as excinfo:
+        update_asg("my-asg", "0", "1", "8", desired_capacity_type="units")
+    assert str(excinfo.value) == "Desired capacity 1 is smaller than the smallest instance weight 2."
+    mock_client.update_auto_scaling_group.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_get_mixed_instances_policy_cached(mock_boto3_client, empty_policy_cache):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = {
+        'AutoScalingGroups': [{'MixedInstancesPolicy': WEIGHTED_POLICY}]
+    }
+
+    assert get_mixed_instances_policy("my-asg") == WEIGHTED_POLICY
+    assert get_mixed_instances_policy("my-asg") == WEIGHTED_POLICY
+    mock_client.describe_auto_scaling_groups.assert_called_once_with(AutoScalingGroupNames=["my-asg"])
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_get_mixed_instances_policy_not_found(mock_boto3_client, empty_policy_cache):
+    mock_boto3_client.return_value.describe_auto_scaling_groups.return_value = {'AutoScalingGroups': []}
+
+    with pytest.raises(ValueError) as excinfo:
+        get_mixed_instances_policy("my-asg")
+    assert str(excinfo.value) == "ASG 'my-asg' not found."
+
+###########################################
+# apply_instance_type_fallback unit tests
+###########################################
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_apply_instance_type_fallback(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = {
+        'AutoScalingGroups': [{
+            'LaunchTemplate': {'LaunchTemplateId': 'lt-123', 'LaunchTemplateName': 'web', 'Version': '$Latest'}
+        }]
+    }
+
+    apply_instance_type_fallback("my-asg", ["m5a.large"])
+
+    mock_client.update_auto_scaling_group.assert_called_once_with(
+        AutoScalingGroupName="my-asg",
+        MixedInstancesPolicy={
+            'LaunchTemplate': {
+                'LaunchTemplateSpecification': {'LaunchTemplateId': 'lt-123', 'Version': '$Latest'},
+                'Overrides': [{'InstanceType': 'm5a.large'}]
+            }
+        }
+    )
+
+
+def weighted_group(override):
+    return {'AutoScalingGroups': [{
+        'MixedInstancesPolicy': {
+            'LaunchTemplate': {
+                'LaunchTemplateSpecification': {'LaunchTemplateId': 'lt-123'},
+                'Overrides': [override]
+            }
+        }
+    }]}
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_apply_instance_type_fallback_keeps_weights(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = weighted_group(
+        {'InstanceType': 'm5.large', 'WeightedCapacity': '2'}
+    )
+
+    apply_instance_type_fallback("my-asg", {"m5a.large": 2, "m5a.xlarge": 4})
+
+    policy = mock_client.update_auto_scaling_group.call_args.kwargs['MixedInstancesPolicy']
+    assert policy['LaunchTemplate']['Overrides'] == [
+        {'InstanceType': 'm5a.large', 'WeightedCapacity': '2'},
+        {'InstanceType': 'm5a.xlarge', 'WeightedCapacity': '4'}
+    ]
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_apply_instance_type_fallback_weighted_needs_mapping(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = weighted_group(
+        {'InstanceType': 'm5.large', 'WeightedCapacity': '2'}
+    )
+
+    with pytest.raises(ValueError) as excinfo:
+        apply_instance_type_fallback("my-asg", ["m5a.large"])
+    assert str(excinfo.value) == (
+        "ASG 'my-asg' uses weighted capacity; fallbackInstanceTypes must map each instance type to its weight."
+    )
+    mock_client.update_auto_scaling_group.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_apply_instance_type_fallback_attribute_based(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = weighted_group(
+        {'InstanceRequirements': {'VCpuCount': {'Min': 2}}}
+    )
+
+    with pytest.raises(ValueError) as excinfo:
+        apply_instance_type_fallback("my-asg", {"m5a.large": 2})
+    assert "attribute-based instance selection" in str(excinfo.value)
+    mock_client.update_auto_scaling_group.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_apply_instance_type_fallback_no_launch_template(mock_boto3_client):
+    mock_boto3_client.return_value.describe_auto_scaling_groups.return_value = {
+        'AutoScalingGroups': [{'LaunchConfigurationName': 'legacy'}]
+    }
+
+    with pytest.raises(ValueError) as excinfo:
+        apply_instance_type_fallback("my-asg", ["m5a.large"])
+    assert str(excinfo.value) == "ASG 'my-asg' has no launch template to fall back from."
+
+###########################################
+# Pre-scale record unit tests
+###########################################
+
+
+def prescaled_group(record=None, **capacities):
+    group = dict({'AutoScalingGroupName': 'my-asg', 'MinSize': 1, 'DesiredCapacity': 1, 'MaxSize': 2}, **capacities)
+    if record is not None:
+        group['Tags'] = [{'Key': 'asg-scaler:prescale', 'Value': json.dumps(record)}]
+    return {'AutoScalingGroups': [group]}
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_record_prescale(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = prescaled_group()
+
+    record = record_prescale("my-asg", "test-pipeline", "exec-1", now=1000.0)
+
+    assert record == {'min': 1, 'desired': 1, 'max': 2, 'pipeline': 'test-pipeline', 'execution': 'exec-1', 'at': 1000}
+    tag = mock_client.create_or_update_tags.call_args.kwargs['Tags'][0]
+    assert tag['ResourceId'] == "my-asg"
+    assert tag['Key'] == "asg-scaler:prescale"
+    assert not tag['PropagateAtLaunch']
+    assert json.loads(tag['Value']) == record
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_record_prescale_keeps_original_capacity(mock_boto3_client):
+    # Pre-scaled again by a newer execution before the first one ended
+    earlier = {'min': 1, 'desired': 1, 'max': 2, 'pipeline': 'test-pipeline', 'execution': 'exec-1', 'at': 900}
+    mock_boto3_client.return_value.describe_auto_scaling_groups.return_value = prescaled_group(
+        earlier, MinSize=4, DesiredCapacity=4, MaxSize=4
+    )
+
+    record = record_prescale("my-asg", "test-pipeline", "exec-2", now=1000.0)
+
+    assert (record['min'], record['desired'], record['max']) == (1, 1, 2)
+    assert (record['execution'], record['at']) == ('exec-2', 1000)
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_take_over_prescale(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    record = {'min': 1, 'desired': 1, 'max': 2, 'pipeline': 'test-pipeline', 'execution': 'exec-1', 'at': 900}
+    mock_client.describe_auto_scaling_groups.return_value = prescaled_group(record)
+
+    assert take_over_prescale("my-asg") == record
+    mock_client.delete_tags.assert_called_once_with(Tags=[
+        {'ResourceId': 'my-asg', 'ResourceType': 'auto-scaling-group', 'Key': 'asg-scaler:prescale'}
+    ])
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_take_over_prescale_not_prescaled(mock_boto3_client):
+    mock_boto3_client.return_value.describe_auto_scaling_groups.return_value = prescaled_group()
+
+    assert take_over_prescale("my-asg") is None
+    mock_boto3_client.return_value.delete_tags.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_restore_prescaled_capacity(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    record = {'min': 1, 'desired': 1, 'max': 2, 'pipeline': 'test-pipeline', 'execution': 'exec-1', 'at': 900}
+    mock_client.describe_auto_scaling_groups.return_value = prescaled_group(
+        record, MinSize=4, DesiredCapacity=4, MaxSize=4
+    )
+
+    message = restore_prescaled_capacity("my-asg", "test-pipeline", "exec-1")
+
+    assert message == "Successfully updated ASG 'my-asg' settings: Min=1, Desired=1, Max=2."
+    mock_client.update_auto_scaling_group.assert_called_once_with(
+        AutoScalingGroupName="my-asg", MinSize=1, MaxSize=2, DesiredCapacity=1
+    )
+    mock_client.delete_tags.assert_called_once()
+
+
+@patch('asg_scaler_lambda.asg_helper.boto3.client')
+def test_restore_prescaled_capacity_other_execution(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    record = {'min': 1, 'desired': 1, 'max': 2, 'pipeline': 'test-pipeline', 'execution': 'exec-2', 'at': 900}
+    mock_client.describe_auto_scaling_groups.return_value = prescaled_group(record)
+
+    assert restore_prescaled_capacity("my-asg", "test-pipeline", "exec-1") is None
+    mock_client.update_auto_scaling_group.assert_not_called()
+    mock_client.delete_tags.assert_not_called()
@@ -1,6 +1,9 @@
 import json
 from unittest.mock import patch
 from asg_scaler_lambda.asg_scaler import lambda_handler
+from asg_scaler_lambda.profile_store import ProfileError
+from asg_scaler_lambda.circuit_breaker import CircuitOpenError
+from asg_scaler_lambda.launch_watcher import WatchResult, WATCHING, LAUNCHED, FAILED
 
 
 @patch('asg_scaler_lambda.asg_scaler.update_asg')
@@ -160,3 +163,622 @@ def test_lambda_handler_eventbridge_no_token(mock_get_approval_token):
     assert response['statusCode'] == 400
     assert response['body'] == "Approval token not found."
     mock_get_approval_token.assert_called_once_with("test-pipeline", "test-stage", "test-action")
+
+##################################################
+# CodePipeline event with a zero capacity
+##################################################
+
+
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+def test_lambda_handler_codepipeline_zero_capacity(mock_report_job_success, mock_update_asg):
+    mock_update_asg.return_value = "ASG updated successfully"
+
+    event = {
+        "CodePipeline.job": {
+            "id": "1234",
+            "data": {
+                "actionConfiguration": {
+                    "configuration": {
+                        "UserParameters": json.dumps({
+                            "asgName": "test-asg",
+                            "minCapacity": 0,
+                            "desiredCapacity": 0,
+                            "maxCapacity": 0
+                        })
+                    }
+                }
+            }
+        }
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 200
+    mock_update_asg.assert_called_once_with("test-asg", 0, 0, 0)
+    mock_report_job_success.assert_called_once_with("1234")
+
+##################################################
+# Unrecognised events
+##################################################
+
+
+def test_lambda_handler_unknown_source():
+    response = lambda_handler({"source": "aws.ec2"}, {})
+    assert response['statusCode'] == 400
+    assert response['body'] == "Event source not recognised."
+
+
+@patch('asg_scaler_lambda.asg_scaler.get_approval_token')
+def test_lambda_handler_eventbridge_not_success(mock_get_approval_token):
+    event = {
+        "source": "aws.codedeploy",
+        "detail": {
+            "state": "FAILURE"
+        }
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 400
+    assert response['body'] == "Event source not recognised."
+    mock_get_approval_token.assert_not_called()
+
+##################################################
+# CodePipeline event referencing a profile
+##################################################
+
+
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+@patch('asg_scaler_lambda.asg_scaler.asg_at_capacity', return_value=False)
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+@patch('asg_scaler_lambda.profile_store.get_profiles')
+def test_lambda_handler_codepipeline_profile(
+    mock_get_profiles, mock_report_job_success, mock_asg_at_capacity, mock_update_asg
+):
+    mock_get_profiles.return_value = {
+        "web-prod-bluegreen": {"asgName": "test-asg", "minCapacity": 2, "desiredCapacity": 4, "maxCapacity": 4}
+    }
+    mock_update_asg.return_value = "ASG updated successfully"
+
+    event = {
+        "CodePipeline.job": {
+            "id": "1234",
+            "data": {
+                "actionConfiguration": {
+                    "configuration": {
+                        "UserParameters": json.dumps({"profile": "web-prod-bluegreen", "desiredCapacity": 3})
+                    }
+                }
+            }
+        }
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 200
+    mock_get_profiles.assert_called_once_with(["web-prod-bluegreen"])
+    mock_update_asg.assert_called_once_with("test-asg", 2, 3, 4)
+
+
+@patch('asg_scaler_lambda.asg_scaler.report_job_failure')
+@patch('asg_scaler_lambda.profile_store.get_profiles', side_effect=ProfileError("Profile not found: missing."))
+def test_lambda_handler_codepipeline_profile_not_found(mock_get_profiles, mock_report_job_failure):
+    event = {
+        "CodePipeline.job": {
+            "id": "1234",
+            "data": {
+                "actionConfiguration": {
+                    "configuration": {
+                        "UserParameters": json.dumps({"profile": "missing"})
+                    }
+                }
+            }
+        }
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 400
+    assert json.loads(response['body']) == "Profile not found: missing."
+    mock_report_job_failure.assert_called_once_with("1234", "Profile not found: missing.")
+
+##################################################
+# CodePipeline event confirming a pre-scaled ASG
+##################################################
+
+
+@patch('asg_scaler_lambda.asg_scaler.take_over_prescale')
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+@patch('asg_scaler_lambda.asg_scaler.asg_at_capacity', return_value=True)
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+@patch('asg_scaler_lambda.profile_store.get_profiles')
+def test_lambda_handler_codepipeline_already_prescaled(
+    mock_get_profiles, mock_report_job_success, mock_asg_at_capacity, mock_update_asg, mock_take_over_prescale
+):
+    mock_get_profiles.return_value = {
+        "web-prod-bluegreen": {"asgName": "test-asg", "minCapacity": 2, "desiredCapacity": 4, "maxCapacity": 4}
+    }
+
+    event = {
+        "CodePipeline.job": {
+            "id": "1234",
+            "data": {
+                "actionConfiguration": {
+                    "configuration": {
+                        "UserParameters": json.dumps({"profile": "web-prod-bluegreen"})
+                    }
+                }
+            }
+        }
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 200
+    assert json.loads(response['body']) == "ASG 'test-asg' already at target capacity."
+    mock_asg_at_capacity.assert_called_once_with("test-asg", 2, 4, 4)
+    mock_update_asg.assert_not_called()
+    mock_report_job_success.assert_called_once_with("1234")
+    mock_take_over_prescale.assert_called_once_with("test-asg")
+
+##################################################
+# CodePipeline stage event triggering pre-scaling
+##################################################
+
+
+def stage_event(state="STARTED"):
+    return {
+        "source": "aws.codepipeline",
+        "detail-type": "CodePipeline Stage Execution State Change",
+        "detail": {
+            "pipeline": "test-pipeline",
+            "execution-id": "exec-1",
+            "stage": "Build",
+            "state": state
+        }
+    }
+
+
+@patch('asg_scaler_lambda.asg_scaler.record_prescale')
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+@patch('asg_scaler_lambda.asg_scaler.get_profiles')
+def test_lambda_handler_stage_started_prescales(mock_get_profiles, mock_update_asg, mock_record_prescale, monkeypatch):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', json.dumps({"test-pipeline": {"Build": "web-prod-bluegreen"}}))
+    mock_get_profiles.return_value = {
+        "web-prod-bluegreen": {"asgName": "test-asg", "minCapacity": 2, "desiredCapacity": 4, "maxCapacity": 4}
+    }
+    mock_update_asg.return_value = "ASG updated successfully"
+
+    response = lambda_handler(stage_event(), {})
+    assert response['statusCode'] == 200
+    assert json.loads(response['body']) == ["ASG updated successfully"]
+    mock_get_profiles.assert_called_once_with(["web-prod-bluegreen"])
+    mock_update_asg.assert_called_once_with("test-asg", 2, 4, 4)
+    mock_record_prescale.assert_called_once_with("test-asg", "test-pipeline", "exec-1")
+
+
+def execution_event(state="FAILED"):
+    return {
+        "source": "aws.codepipeline",
+        "detail-type": "CodePipeline Pipeline Execution State Change",
+        "detail": {"pipeline": "test-pipeline", "execution-id": "exec-1", "state": state}
+    }
+
+
+@patch('asg_scaler_lambda.asg_scaler.restore_prescaled_capacity')
+@patch('asg_scaler_lambda.asg_scaler.get_profiles')
+def test_lambda_handler_execution_failed_restores_prescale(
+    mock_get_profiles, mock_restore_prescaled_capacity, monkeypatch
+):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', json.dumps({"test-pipeline": {"Build": "web", "Test": ["web", "api"]}}))
+    mock_get_profiles.return_value = {
+        "web": {"asgName": "web-asg", "minCapacity": 2, "desiredCapacity": 4, "maxCapacity": 4},
+        "api": {"asgName": "api-asg", "minCapacity": 2, "desiredCapacity": 4, "maxCapacity": 4}
+    }
+    mock_restore_prescaled_capacity.side_effect = ["Successfully updated ASG 'web-asg' settings.", None]
+
+    response = lambda_handler(execution_event(), {})
+    assert response['statusCode'] == 200
+    assert json.loads(response['body']) == ["Successfully updated ASG 'web-asg' settings."]
+    mock_get_profiles.assert_called_once_with(["web", "api"])
+    mock_restore_prescaled_capacity.assert_any_call("web-asg", "test-pipeline", "exec-1")
+    mock_restore_prescaled_capacity.assert_any_call("api-asg", "test-pipeline", "exec-1")
+
+
+@patch('asg_scaler_lambda.asg_scaler.restore_prescaled_capacity')
+def test_lambda_handler_execution_succeeded_ignored(mock_restore_prescaled_capacity):
+    response = lambda_handler(execution_event("SUCCEEDED"), {})
+    assert response['statusCode'] == 400
+    mock_restore_prescaled_capacity.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_scaler.restore_prescaled_capacity', side_effect=ValueError("ASG 'web-asg' not found."))
+@patch('asg_scaler_lambda.asg_scaler.get_profiles')
+def test_lambda_handler_execution_restore_failure(mock_get_profiles, mock_restore_prescaled_capacity, monkeypatch):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', json.dumps({"test-pipeline": {"Build": "web"}}))
+    mock_get_profiles.return_value = {
+        "web": {"asgName": "web-asg", "minCapacity": 2, "desiredCapacity": 4, "maxCapacity": 4}
+    }
+
+    response = lambda_handler(execution_event("SUPERSEDED"), {})
+    assert response['statusCode'] == 500
+    assert json.loads(response['body']) == ["Profile 'web': ASG 'web-asg' not found."]
+
+
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+def test_lambda_handler_stage_not_configured(mock_update_asg, monkeypatch):
+    monkeypatch.delenv('PRESCALE_TRIGGERS', raising=False)
+
+    response = lambda_handler(stage_event(), {})
+    assert response['statusCode'] == 200
+    assert json.loads(response['body']) == []
+    mock_update_asg.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+def test_lambda_handler_stage_not_started(mock_update_asg):
+    response = lambda_handler(stage_event("FAILED"), {})
+    assert response['statusCode'] == 400
+    mock_update_asg.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_scaler.record_phase')
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+def test_lambda_handler_stage_succeeded_records_stage(mock_update_asg, mock_record_phase):
+    response = lambda_handler(stage_event("SUCCEEDED"), {})
+    assert response['statusCode'] == 200
+    mock_record_phase.assert_called_once_with("test-pipeline", "exec-1", None, "stage:Build")
+    mock_update_asg.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_scaler.record_phase')
+def test_lambda_handler_stage_started_records_start(mock_record_phase, monkeypatch):
+    monkeypatch.delenv('PRESCALE_TRIGGERS', raising=False)
+    lambda_handler(stage_event(), {})
+    mock_record_phase.assert_called_once_with("test-pipeline", "exec-1", None, "stage-started:Build")
+
+
+@patch('asg_scaler_lambda.asg_scaler.record_prescale')
+@patch('asg_scaler_lambda.asg_scaler.update_asg', side_effect=ValueError("Capacity settings cannot be negative."))
+@patch('asg_scaler_lambda.asg_scaler.get_profiles')
+def test_lambda_handler_stage_prescale_failure(mock_get_profiles, mock_update_asg, mock_record_prescale, monkeypatch):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', json.dumps({"test-pipeline": {"Build": ["web"]}}))
+    mock_get_profiles.return_value = {"web": {"asgName": "test-asg", "minCapacity": -1,
+                                              "desiredCapacity": 4, "maxCapacity": 4}}
+
+    response = lambda_handler(stage_event(), {})
+    assert response['statusCode'] == 500
+    assert json.loads(response['body']) == ["Profile 'web': Capacity settings cannot be negative."]
+
+##################################################
+# Deployment timeline recording
+##################################################
+
+
+@patch('asg_scaler_lambda.asg_scaler.record_phase')
+@patch('asg_scaler_lambda.asg_scaler.update_asg', return_value="ASG updated successfully")
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+def test_lambda_handler_codepipeline_records_phase(mock_report_job_success, mock_update_asg, mock_record_phase):
+    event = {
+        "CodePipeline.job": {
+            "id": "1234",
+            "data": {
+                "actionConfiguration": {
+                    "configuration": {
+                        "UserParameters": json.dumps({
+                            "asgName": "test-asg",
+                            "minCapacity": "1",
+                            "desiredCapacity": "2",
+                            "maxCapacity": "3",
+                            "pipelineName": "test-pipeline",
+                            "executionId": "exec-1",
+                            "phase": "scale-out"
+                        })
+                    }
+                }
+            }
+        }
+    }
+
+    lambda_handler(event, {})
+    mock_record_phase.assert_called_once_with("test-pipeline", "exec-1", "test-asg", "scale-out")
+
+
+@patch('asg_scaler_lambda.asg_scaler.record_phase')
+@patch('asg_scaler_lambda.asg_scaler.approve_action', return_value={'statusCode': 200, 'body': 'ok'})
+@patch('asg_scaler_lambda.asg_scaler.get_approval_token', return_value='token123')
+def test_lambda_handler_eventbridge_records_phases(mock_get_approval_token, mock_approve_action, mock_record_phase):
+    event = {
+        "source": "aws.codedeploy",
+        "detail": {"state": "SUCCESS"},
+        "pipelineName": "test-pipeline",
+        "stageName": "test-stage",
+        "actionName": "test-action",
+        "executionId": "exec-1"
+    }
+
+    lambda_handler(event, {})
+    assert [c.args[3] for c in mock_record_phase.call_args_list] == ["codedeploy", "approval"]
+
+##################################################
+# Circuit breaker open
+##################################################
+
+
+@patch('asg_scaler_lambda.asg_scaler.report_job_failure')
+@patch('asg_scaler_lambda.asg_scaler.update_asg', side_effect=CircuitOpenError("AWS autoscaling API is unavailable"))
+def test_lambda_handler_codepipeline_circuit_open(mock_update_asg, mock_report_job_failure):
+    event = {
+        "CodePipeline.job": {
+            "id": "1234",
+            "data": {
+                "actionConfiguration": {
+                    "configuration": {
+                        "UserParameters": json.dumps({
+                            "asgName": "test-asg",
+                            "minCapacity": "1",
+                            "desiredCapacity": "2",
+                            "maxCapacity": "3"
+                        })
+                    }
+                }
+            }
+        }
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 503
+    mock_report_job_failure.assert_called_once_with("1234", "AWS autoscaling API is unavailable")
+
+
+@patch('asg_scaler_lambda.asg_scaler.get_approval_token', side_effect=CircuitOpenError("unavailable"))
+def test_lambda_handler_eventbridge_circuit_open(mock_get_approval_token):
+    event = {
+        "source": "aws.codedeploy",
+        "detail": {"state": "SUCCESS"},
+        "pipelineName": "test-pipeline",
+        "stageName": "test-stage",
+        "actionName": "test-action"
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 503
+    assert json.loads(response['body']) == "unavailable"
+
+##################################################
+# EventBridge event approving several actions
+##################################################
+
+
+@patch('asg_scaler_lambda.asg_scaler.approve_actions')
+def test_lambda_handler_eventbridge_multiple_approvals(mock_approve_actions, monkeypatch):
+    monkeypatch.setenv('APPROVAL_TARGETS', json.dumps({
+        "test-app/test-group": [{"pipelineName": "other-pipeline", "stageName": "Deploy", "actionName": "Approve"}]
+    }))
+    mock_approve_actions.return_value = [
+        {'pipelineName': 'test-pipeline', 'statusCode': 200},
+        {'pipelineName': 'other-pipeline', 'statusCode': 400},
+    ]
+    event = {
+        "source": "aws.codedeploy",
+        "detail": {"state": "SUCCESS", "application": "test-app", "deploymentGroup": "test-group"},
+        "pipelineName": "test-pipeline",
+        "stageName": "test-stage",
+        "actionName": "test-action"
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 207
+    assert json.loads(response['body']) == mock_approve_actions.return_value
+    mock_approve_actions.assert_called_once_with([
+        ("test-pipeline", "test-stage", "test-action"),
+        ("other-pipeline", "Deploy", "Approve"),
+    ])
+
+
+@patch('asg_scaler_lambda.asg_scaler.approve_action')
+@patch('asg_scaler_lambda.asg_scaler.get_approval_token', return_value='token123')
+def test_lambda_handler_eventbridge_configured_single_approval(mock_get_approval_token, mock_approve_action,
+                                                               monkeypatch):
+    monkeypatch.setenv('APPROVAL_TARGETS', json.dumps({
+        "test-app/test-group": [{"pipelineName": "test-pipeline", "stageName": "Deploy", "actionName": "Approve"}]
+    }))
+    mock_approve_action.return_value = {'statusCode': 200, 'body': 'Approval submitted successfully.'}
+    event = {
+        "source": "aws.codedeploy",
+        "detail": {"state": "SUCCESS", "application": "test-app", "deploymentGroup": "test-group"}
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 200
+    mock_approve_action.assert_called_once_with("test-pipeline", "Deploy", "Approve", "token123")
+
+##################################################
+# Launch watching via continuation tokens
+##################################################
+
+
+def watched_job_event(continuation_token=None):
+    event = {
+        "CodePipeline.job": {
+            "id": "1234",
+            "data": {
+                "actionConfiguration": {
+                    "configuration": {
+                        "UserParameters": json.dumps({
+                            "asgName": "test-asg",
+                            "minCapacity": "1",
+                            "desiredCapacity": "2",
+                            "maxCapacity": "3",
+                            "watchLaunches": True
+                        })
+                    }
+                }
+            }
+        }
+    }
+    if continuation_token:
+        event["CodePipeline.job"]["data"]["continuationToken"] = continuation_token
+    return event
+
+
+@patch('asg_scaler_lambda.asg_scaler.update_asg', return_value="ASG updated successfully")
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+def test_lambda_handler_codepipeline_starts_watch(mock_report_job_success, mock_update_asg):
+    response = lambda_handler(watched_job_event(), {})
+
+    assert response['statusCode'] == 202
+    token = mock_report_job_success.call_args.kwargs['continuation_token']
+    assert json.loads(token)['asg'] == "test-asg"
+
+
+@patch('asg_scaler_lambda.asg_scaler.update_asg', return_value="ASG updated successfully")
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+@patch('asg_scaler_lambda.asg_scaler.time.time', return_value=1000.0)
+def test_lambda_handler_codepipeline_watch_since_before_update(mock_time, mock_report_job_success, mock_update_asg):
+    lambda_handler(watched_job_event(), {})
+
+    token = json.loads(mock_report_job_success.call_args.kwargs['continuation_token'])
+    assert token['since'] == 990.0
+
+
+@patch('asg_scaler_lambda.asg_scaler.take_over_prescale', return_value={'execution': 'exec-1', 'at': 1500})
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+@patch('asg_scaler_lambda.asg_scaler.asg_at_capacity', return_value=True)
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+@patch('asg_scaler_lambda.profile_store.get_profiles')
+@patch('asg_scaler_lambda.asg_scaler.time.time', return_value=2000.0)
+def test_lambda_handler_codepipeline_already_prescaled_starts_watch(
+    mock_time, mock_get_profiles, mock_report_job_success, mock_asg_at_capacity, mock_update_asg,
+    mock_take_over_prescale
+):
+    mock_get_profiles.return_value = {
+        "web-prod-bluegreen": {
+            "asgName": "test-asg", "minCapacity": 2, "desiredCapacity": 4, "maxCapacity": 4, "watchLaunches": True
+        }
+    }
+    event = watched_job_event()
+    event["CodePipeline.job"]["data"]["actionConfiguration"]["configuration"]["UserParameters"] = json.dumps(
+        {"profile": "web-prod-bluegreen"}
+    )
+
+    response = lambda_handler(event, {})
+
+    assert response['statusCode'] == 202
+    mock_update_asg.assert_not_called()
+    token = json.loads(mock_report_job_success.call_args.kwargs['continuation_token'])
+    assert token['since'] == 1490.0
+    assert token['prescaled']
+
+
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+@patch('asg_scaler_lambda.asg_scaler.report_job_failure')
+@patch('asg_scaler_lambda.asg_scaler.check_watch')
+def test_lambda_handler_codepipeline_watch_failure(mock_check_watch, mock_report_job_failure, mock_update_asg):
+    message = "Launch failed for ASG 'test-asg': Insufficient capacity."
+    mock_check_watch.return_value = WatchResult(FAILED, message, None)
+
+    response = lambda_handler(watched_job_event("token"), {})
+
+    assert response['statusCode'] == 500
+    mock_check_watch.assert_called_once()
+    mock_report_job_failure.assert_called_once_with("1234", message)
+    mock_update_asg.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+@patch('asg_scaler_lambda.asg_scaler.check_watch')
+def test_lambda_handler_codepipeline_watch_continues(mock_check_watch, mock_report_job_success):
+    mock_check_watch.return_value = WatchResult(WATCHING, "1 launch activities pending.", "next-token")
+
+    response = lambda_handler(watched_job_event("token"), {})
+
+    assert response['statusCode'] == 202
+    mock_report_job_success.assert_called_once_with("1234", continuation_token="next-token")
+
+
+@patch('asg_scaler_lambda.asg_scaler.record_phase')
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+@patch('asg_scaler_lambda.asg_scaler.check_watch')
+def test_lambda_handler_codepipeline_watch_launched(mock_check_watch, mock_report_job_success, mock_record_phase):
+    mock_check_watch.return_value = WatchResult(LAUNCHED, "All launch activities succeeded.", None)
+
+    response = lambda_handler(watched_job_event("token"), {})
+
+    assert response['statusCode'] == 200
+    mock_report_job_success.assert_called_once_with("1234")
+    mock_record_phase.assert_called_once_with(None, None, "test-asg", "inservice")
+
+
+@patch('asg_scaler_lambda.asg_scaler.update_asg', return_value="ASG updated successfully")
+@patch('asg_scaler_lambda.asg_scaler.record_phase')
+@patch('asg_scaler_lambda.asg_scaler.report_job_success')
+def test_lambda_handler_codepipeline_watch_records_scale_phase(
+    mock_report_job_success, mock_record_phase, mock_update_asg
+):
+    lambda_handler(watched_job_event(), {})
+
+    mock_record_phase.assert_called_once_with(None, None, "test-asg", "scale")
+
+
+@patch('asg_scaler_lambda.asg_scaler.report_job_failure')
+def test_lambda_handler_codepipeline_invalid_profile_name(mock_report_job_failure):
+    event = {
+        "CodePipeline.job": {
+            "id": "1234",
+            "data": {
+                "actionConfiguration": {
+                    "configuration": {
+                        "UserParameters": json.dumps({"profile": ["a"]})
+                    }
+                }
+            }
+        }
+    }
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 400
+    mock_report_job_failure.assert_called_once_with("1234", "Profile name must be a non-empty string.")
+
+
+@patch('asg_scaler_lambda.asg_scaler.update_asg')
+def test_lambda_handler_stage_malformed_triggers(mock_update_asg, monkeypatch):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', json.dumps({"test-pipeline": ["Build"]}))
+
+    response = lambda_handler(stage_event(), {})
+    assert response['statusCode'] == 400
+    mock_update_asg.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_scaler.get_approval_token')
+def test_lambda_handler_eventbridge_no_approvals(mock_get_approval_token, monkeypatch):
+    monkeypatch.delenv('APPROVAL_TARGETS', raising=False)
+    event = {"source": "aws.codedeploy", "detail": {"state": "SUCCESS"}}
+
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 400
+    assert response['body'] == "No approval actions to approve."
+    mock_get_approval_token.assert_not_called()
+
+
+@patch('asg_scaler_lambda.asg_scaler.record_phase')
+@patch('asg_scaler_lambda.asg_scaler.approve_actions')
+def test_lambda_handler_eventbridge_multiple_approvals_records_own_pipeline(mock_approve_actions, mock_record_phase,
+                                                                            monkeypatch):
+    monkeypatch.setenv('APPROVAL_TARGETS', json.dumps({
+        "test-app/test-group": [{"pipelineName": "other-pipeline", "stageName": "Deploy", "actionName": "Approve"}]
+    }))
+    mock_approve_actions.return_value = [
+        {'pipelineName': 'test-pipeline', 'statusCode': 200},
+        {'pipelineName': 'other-pipeline', 'statusCode': 200},
+    ]
+    event = {
+        "source": "aws.codedeploy",
+        "detail": {"state": "SUCCESS", "application": "test-app", "deploymentGroup": "test-group"},
+        "pipelineName": "test-pipeline",
+        "stageName": "test-stage",
+        "actionName": "test-action",
+        "executionId": "exec-1"
+    }
+
+    lambda_handler(event, {})
+    assert [c.args for c in mock_record_phase.call_args_list] == [
+        ("test-pipeline", "exec-1", None, "codedeploy"),
+        ("test-pipeline", "exec-1", None, "approval"),
+    ]
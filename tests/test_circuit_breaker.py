@@ -0,0 +1,174 @@
+from asg_scaler_lambda.circuit_breaker import (
+    CLOSED, OPEN, HALF_OPEN, CircuitBreaker, CircuitOpenError,
+    get_circuit_breaker, get_client_config, is_service_failure, reset_circuit_breakers
+)
+from botocore.exceptions import ClientError, EndpointConnectionError, ParamValidationError, ReadTimeoutError
+from asg_scaler_lambda.codepipeline_event import AWS_REGION, get_approval_token
+from unittest.mock import patch, MagicMock
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def client_error(code, status):
+    return ClientError({'Error': {'Code': code}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'Operation')
+
+
+def fail():
+    raise EndpointConnectionError(endpoint_url="https://autoscaling.us-east-1.amazonaws.com")
+
+
+def invalid_request():
+    raise ParamValidationError(report="Invalid type for parameter name, value: None")
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers():
+    reset_circuit_breakers()
+    yield
+    reset_circuit_breakers()
+
+############################################
+# CircuitBreaker unit tests
+############################################
+
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, clock=FakeClock())
+    for _ in range(2):
+        with pytest.raises(Exception):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "not called")
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2, clock=FakeClock())
+    with pytest.raises(Exception):
+        breaker.call(fail)
+    assert breaker.call(lambda: "ok") == "ok"
+    with pytest.raises(Exception):
+        breaker.call(fail)
+    assert breaker.state == CLOSED
+
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("test", failure_threshold=1, slow_call_seconds=5, clock=FakeClock())
+    breaker.before_call()
+    breaker.record_success(6.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_closes_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30, clock=clock)
+    with pytest.raises(Exception):
+        breaker.call(fail)
+
+    clock.now = 31
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_failure_reopens_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30, clock=clock)
+    with pytest.raises(Exception):
+        breaker.call(fail)
+
+    clock.now = 31
+    with pytest.raises(Exception):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_client_errors_do_not_open_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, clock=FakeClock())
+
+    def bad_request():
+        raise client_error('ValidationError', 400)
+
+    with pytest.raises(ClientError):
+        breaker.call(bad_request)
+    assert breaker.state == CLOSED
+
+############################################
+# is_service_failure unit tests
+############################################
+
+
+def test_is_service_failure():
+    assert is_service_failure(client_error('InternalFailure', 500))
+    assert is_service_failure(client_error('Throttling', 400))
+    assert not is_service_failure(client_error('ValidationError', 400))
+    assert is_service_failure(ReadTimeoutError(endpoint_url="https://codepipeline.us-east-1.amazonaws.com"))
+    assert not is_service_failure(ParamValidationError(report="Invalid type for parameter name"))
+    assert not is_service_failure(Exception("unexpected"))
+
+
+def test_param_validation_errors_do_not_open_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, clock=FakeClock())
+    for _ in range(3):
+        with pytest.raises(ParamValidationError):
+            breaker.call(invalid_request)
+    assert breaker.state == CLOSED
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def test_param_validation_error_does_not_close_half_open_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30, clock=clock)
+    with pytest.raises(Exception):
+        breaker.call(fail)
+
+    clock.now = 31
+    with pytest.raises(ParamValidationError):
+        breaker.call(invalid_request)
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "probe") == "probe"
+    assert breaker.state == CLOSED
+
+
+@patch('asg_scaler_lambda.codepipeline_event.get_codepipeline_client')
+def test_malformed_events_do_not_block_approvals(mock_get_client):
+    mock_client = MagicMock()
+    mock_client.get_pipeline_state.side_effect = ParamValidationError(report="Invalid type for parameter name")
+    mock_get_client.return_value = mock_client
+
+    for _ in range(4):
+        assert get_approval_token(None, None, None) is None
+    assert get_circuit_breaker('codepipeline', AWS_REGION).state == CLOSED
+
+############################################
+# registry and client config unit tests
+############################################
+
+
+def test_get_circuit_breaker_per_service_and_region():
+    breaker = get_circuit_breaker('autoscaling', 'eu-west-1')
+    assert get_circuit_breaker('autoscaling', 'eu-west-1') is breaker
+    assert get_circuit_breaker('autoscaling', 'us-east-1') is not breaker
+    assert get_circuit_breaker('codepipeline', 'eu-west-1') is not breaker
+
+
+def test_get_client_config_timeouts(monkeypatch):
+    monkeypatch.setenv('AWS_CONNECT_TIMEOUT', '1')
+    monkeypatch.setenv('AWS_READ_TIMEOUT', '3')
+    config = get_client_config()
+    assert config.connect_timeout == 1.0
+    assert config.read_timeout == 3.0
@@ -1,9 +1,11 @@
 from asg_scaler_lambda.codepipeline_event import (
     report_job_success, report_job_failure, approve_action,
-    get_approval_token, find_action_in_stage, extract_token_if_available
+    get_approval_token, find_action_in_stage, extract_token_if_available, approve_actions
 )
 from unittest.mock import patch, MagicMock
+from asg_scaler_lambda.circuit_breaker import CircuitOpenError
 import json
+import pytest
 
 ############################################
 # report_job_success unit tests
@@ -261,3 +263,95 @@ def test_extract_token_if_available_wrong_status():
     }
     token = extract_token_if_available(action)
     assert token is None
+
+
+@patch('asg_scaler_lambda.codepipeline_event.get_circuit_breaker')
+@patch('asg_scaler_lambda.codepipeline_event.get_codepipeline_client')
+def test_get_approval_token_circuit_open(mock_get_client, mock_get_circuit_breaker):
+    # Setup breaker to reject the call
+    mock_get_circuit_breaker.return_value.call.side_effect = CircuitOpenError("unavailable")
+
+    # Execute the function under test
+    with pytest.raises(CircuitOpenError):
+        get_approval_token("test-pipeline", "test-stage", "test-action")
+
+    # Assertions
+    mock_get_client.return_value.get_pipeline_state.assert_not_called()
+
+############################################
+# approve_actions unit tests
+############################################
+
+
+def pipeline_state(*actions):
+    return {
+        'stageStates': [
+            {
+                'stageName': 'test-stage',
+                'actionStates': [
+                    {'actionName': name, 'latestExecution': {'status': 'InProgress', 'token': f"{name}-token"}}
+                    for name in actions
+                ]
+            }
+        ]
+    }
+
+
+@patch('asg_scaler_lambda.codepipeline_event.get_codepipeline_client')
+def test_approve_actions_fetches_state_once_per_pipeline(mock_get_client):
+    mock_client = MagicMock()
+    mock_client.get_pipeline_state.side_effect = lambda name: pipeline_state('approve-a', 'approve-b')
+    mock_client.put_approval_result.return_value = {}
+    mock_get_client.return_value = mock_client
+
+    results = approve_actions([
+        ("pipeline-1", "test-stage", "approve-a"),
+        ("pipeline-1", "test-stage", "approve-b"),
+        ("pipeline-2", "test-stage", "approve-a"),
+    ])
+
+    assert [r['statusCode'] for r in results] == [200, 200, 200]
+    assert results[1]['actionName'] == "approve-b"
+    assert mock_client.get_pipeline_state.call_count == 2
+    assert mock_client.put_approval_result.call_count == 3
+    mock_get_client.assert_called_once()
+
+
+@patch('asg_scaler_lambda.codepipeline_event.get_codepipeline_client')
+def test_approve_actions_partial_failure(mock_get_client):
+    mock_client = MagicMock()
+
+    def get_state(name):
+        if name == "broken-pipeline":
+            raise Exception("AWS service exception")
+        return pipeline_state('approve-a')
+
+    def put_approval_result(**kwargs):
+        if kwargs['pipelineName'] == "pipeline-2":
+            raise Exception("Approval rejected")
+        return {}
+
+    mock_client.get_pipeline_state.side_effect = get_state
+    mock_client.put_approval_result.side_effect = put_approval_result
+    mock_get_client.return_value = mock_client
+
+    results = approve_actions([
+        ("pipeline-1", "test-stage", "approve-a"),
+        ("pipeline-1", "test-stage", "missing-action"),
+        ("pipeline-2", "test-stage", "approve-a"),
+        ("broken-pipeline", "test-stage", "approve-a"),
+    ])
+
+    assert [r['statusCode'] for r in results] == [200, 400, 500, 500]
+    assert results[1]['body'] == 'Approval token not found.'
+    assert results[3]['body'] == 'AWS service exception'
+
+
+@patch('asg_scaler_lambda.codepipeline_event.get_codepipeline_client')
+def test_report_job_success_with_continuation_token(mock_get_client):
+    mock_client = MagicMock()
+    mock_get_client.return_value = mock_client
+
+    report_job_success("12345", continuation_token="token")
+
+    mock_client.put_job_success_result.assert_called_once_with(jobId="12345", continuationToken="token")
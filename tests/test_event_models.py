@@ -0,0 +1,183 @@
+from asg_scaler_lambda.event_models import (
+    AsgTarget, CodePipelineJob, EventParseError, get_event_source,
+    parse_codepipeline_job, parse_asg_target, parse_codedeploy_state_change, parse_stage_state_change,
+    parse_execution_state_change
+)
+import json
+import pytest
+
+
+def codepipeline_event(user_parameters):
+    return {
+        "CodePipeline.job": {
+            "id": "1234",
+            "data": {
+                "actionConfiguration": {
+                    "configuration": {
+                        "UserParameters": user_parameters
+                    }
+                }
+            }
+        }
+    }
+
+############################################
+# get_event_source unit tests
+############################################
+
+
+def test_get_event_source_codepipeline():
+    assert get_event_source(codepipeline_event("{}")) == "CodePipeline.job"
+
+
+def test_get_event_source_eventbridge():
+    assert get_event_source({"source": "aws.codedeploy"}) == "aws.codedeploy"
+
+
+def test_get_event_source_unknown():
+    assert get_event_source({}) is None
+
+############################################
+# parse_codepipeline_job unit tests
+############################################
+
+
+def test_parse_codepipeline_job_success():
+    job = parse_codepipeline_job(codepipeline_event(json.dumps({"asgName": "test-asg"})))
+    assert job.job_id == "1234"
+    assert job.user_parameters == {"asgName": "test-asg"}
+    assert job.continuation_token is None
+
+
+def test_parse_codepipeline_job_continuation_token():
+    event = codepipeline_event("{}")
+    event["CodePipeline.job"]["data"]["continuationToken"] = "token"
+    assert parse_codepipeline_job(event).continuation_token == "token"
+
+
+def test_parse_codepipeline_job_invalid_json():
+    with pytest.raises(EventParseError) as excinfo:
+        parse_codepipeline_job(codepipeline_event("invalid_json"))
+    assert str(excinfo.value) == "Invalid UserParameters format."
+    assert excinfo.value.job_id == "1234"
+
+
+def test_parse_codepipeline_job_not_an_object():
+    with pytest.raises(EventParseError) as excinfo:
+        parse_codepipeline_job(codepipeline_event("[1, 2]"))
+    assert str(excinfo.value) == "Invalid UserParameters format."
+
+############################################
+# parse_asg_target unit tests
+############################################
+
+
+def test_parse_asg_target_zero_capacity():
+    params = {"asgName": "test-asg", "minCapacity": 0, "desiredCapacity": 0, "maxCapacity": 0}
+    job = CodePipelineJob("1234", params, None)
+    target = parse_asg_target(job)
+    assert target == AsgTarget("test-asg", 0, 0, 0, None)
+    assert target.as_args() == ("test-asg", 0, 0, 0)
+
+
+def test_parse_asg_target_missing_parameters():
+    job = CodePipelineJob("1234", {"asgName": "test-asg", "minCapacity": 1}, None)
+    with pytest.raises(EventParseError) as excinfo:
+        parse_asg_target(job)
+    assert str(excinfo.value) == "Missing required parameters."
+    assert excinfo.value.job_id == "1234"
+
+
+def test_models_are_slotted():
+    target = AsgTarget("test-asg", 1, 2, 3, None)
+    with pytest.raises(AttributeError):
+        target.unexpected = True
+
+############################################
+# parse_codedeploy_state_change unit tests
+############################################
+
+
+def test_parse_codedeploy_state_change():
+    change = parse_codedeploy_state_change({
+        "source": "aws.codedeploy",
+        "detail": {"state": "SUCCESS"},
+        "pipelineName": "test-pipeline",
+        "stageName": "test-stage",
+        "actionName": "test-action"
+    })
+    assert change.succeeded
+    assert change.pipeline_name == "test-pipeline"
+    assert change.stage_name == "test-stage"
+    assert change.action_name == "test-action"
+
+
+def test_parse_codedeploy_state_change_no_detail():
+    change = parse_codedeploy_state_change({"source": "aws.codedeploy"})
+    assert not change.succeeded
+
+############################################
+# parse_stage_state_change unit tests
+############################################
+
+
+def test_parse_stage_state_change():
+    change = parse_stage_state_change({
+        "source": "aws.codepipeline",
+        "detail-type": "CodePipeline Stage Execution State Change",
+        "detail": {"pipeline": "test-pipeline", "execution-id": "exec-1", "stage": "Build", "state": "STARTED"}
+    })
+    assert change.started
+    assert change.pipeline_name == "test-pipeline"
+    assert change.execution_id == "exec-1"
+    assert change.stage_name == "Build"
+
+
+def test_parse_stage_state_change_other_detail_type():
+    assert parse_stage_state_change({
+        "source": "aws.codepipeline",
+        "detail-type": "CodePipeline Pipeline Execution State Change"
+    }) is None
+
+
+@pytest.mark.parametrize("state, abandoned", [
+    ("FAILED", True), ("CANCELED", True), ("STOPPED", True), ("SUPERSEDED", True), ("SUCCEEDED", False)
+])
+def test_parse_execution_state_change(state, abandoned):
+    change = parse_execution_state_change({
+        "source": "aws.codepipeline",
+        "detail-type": "CodePipeline Pipeline Execution State Change",
+        "detail": {"pipeline": "test-pipeline", "execution-id": "exec-1", "state": state}
+    })
+    assert change.abandoned == abandoned
+    assert change.pipeline_name == "test-pipeline"
+    assert change.execution_id == "exec-1"
+
+
+def test_parse_execution_state_change_other_detail_type():
+    assert parse_execution_state_change({
+        "source": "aws.codepipeline",
+        "detail-type": "CodePipeline Stage Execution State Change"
+    }) is None
+
+
+def test_parse_asg_target_capacity_type():
+    params = {"asgName": "test-asg", "minCapacity": 0, "desiredCapacity": 8, "maxCapacity": 16}
+    untyped = parse_asg_target(CodePipelineJob("1234", params, None))
+    typed = parse_asg_target(CodePipelineJob("1234", dict(params, desiredCapacityType="vcpu"), None))
+    assert untyped.as_kwargs() == {}
+    assert typed.as_kwargs() == {"desired_capacity_type": "vcpu"}
+
+
+def test_parse_codedeploy_state_change_approvals_list():
+    change = parse_codedeploy_state_change({
+        "source": "aws.codedeploy",
+        "detail": {"state": "SUCCESS", "application": "app", "deploymentGroup": "group"},
+        "approvals": [
+            {"pipelineName": "p1", "stageName": "s", "actionName": "a"},
+            {"stageName": "no-pipeline"},
+        ]
+    })
+    assert change.application == "app"
+    assert change.deployment_group == "group"
+    assert [a.as_args() for a in change.approvals] == [("p1", "s", "a")]
@@ -0,0 +1,224 @@
+from asg_scaler_lambda.launch_watcher import (
+    WATCHING, LAUNCHED, FAILED, check_watch, start_watch, watch_enabled, get_prescale_since
+)
+from datetime import datetime, timezone
+from unittest.mock import patch
+import json
+import pytest
+
+
+def activity(activity_id, status_code, message=None, started=1000.0):
+    return {
+        'ActivityId': activity_id,
+        'Description': f"Launching a new EC2 instance: {activity_id}",
+        'StartTime': datetime.fromtimestamp(started, tz=timezone.utc),
+        'StatusCode': status_code,
+        'StatusMessage': message
+    }
+
+
+def token(**overrides):
+    state = {'asg': 'my-asg', 'since': 900.0, 'deadline': 1500.0, 'seen': [], 'fallback': False}
+    state.update(overrides)
+    return json.dumps(state)
+
+############################################
+# watch_enabled and start_watch unit tests
+############################################
+
+
+def test_watch_enabled(monkeypatch):
+    monkeypatch.delenv('WATCH_LAUNCHES', raising=False)
+    assert not watch_enabled({})
+    assert watch_enabled({"watchLaunches": True})
+    monkeypatch.setenv('WATCH_LAUNCHES', 'true')
+    assert watch_enabled({})
+    assert not watch_enabled({"watchLaunches": False})
+
+
+def test_start_watch():
+    watch = start_watch("my-asg", {"watchTimeout": 60}, 995.0, now=1000.0)
+    assert watch.status == WATCHING
+    assert json.loads(watch.continuation_token) == {
+        'asg': 'my-asg', 'since': 985.0, 'deadline': 1060.0, 'seen': [], 'fallback': False
+    }
+
+
+def test_get_prescale_since(monkeypatch):
+    monkeypatch.setenv('PRESCALE_WATCH_LOOKBACK', '300')
+    assert get_prescale_since({'execution': 'exec-1', 'at': 640}, now=1000.0) == 640.0
+    assert get_prescale_since(None, now=1000.0) == 700.0
+
+
+def test_start_watch_prescaled():
+    watch = start_watch("my-asg", {}, 640.0, now=1000.0, prescaled=True)
+    assert json.loads(watch.continuation_token)['prescaled']
+
+############################################
+# check_watch unit tests
+############################################
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_ignores_older_and_non_launch_activities(mock_boto3_client):
+    scale_in = dict(activity('b', 'InProgress'), Description="Terminating EC2 instance: i-123")
+    mock_boto3_client.return_value.describe_scaling_activities.return_value = {
+        'Activities': [activity('a', 'Failed', started=800.0), scale_in, activity('c', 'Successful')]
+    }
+
+    watch = check_watch(token(), {}, now=1100.0)
+
+    assert watch.status == LAUNCHED
+    mock_boto3_client.return_value.describe_scaling_activities.assert_called_once_with(
+        AutoScalingGroupName="my-asg", MaxRecords=50
+    )
+    mock_boto3_client.return_value.describe_auto_scaling_groups.assert_not_called()
+
+
+def in_service_group(desired, *lifecycle_states):
+    return {'AutoScalingGroups': [{
+        'DesiredCapacity': desired,
+        'Instances': [{'LifecycleState': state, 'WeightedCapacity': '2'} for state in lifecycle_states]
+    }]}
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_no_activities_waits_for_in_service(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_scaling_activities.return_value = {'Activities': []}
+    mock_client.describe_auto_scaling_groups.return_value = in_service_group(4, 'InService', 'Pending')
+
+    watch = check_watch(token(), {}, now=1100.0)
+
+    assert watch.status == WATCHING
+    assert watch.message == "Waiting for launch activities of ASG 'my-asg'."
+    mock_client.describe_auto_scaling_groups.assert_called_once_with(AutoScalingGroupNames=["my-asg"])
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_no_activities_capacity_in_service(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_scaling_activities.return_value = {'Activities': []}
+    mock_client.describe_auto_scaling_groups.return_value = in_service_group(4, 'InService', 'InService')
+
+    watch = check_watch(token(), {}, now=1100.0)
+
+    assert watch.status == LAUNCHED
+    assert watch.message == "ASG 'my-asg' has 4 of 4 capacity InService."
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_no_activities_by_deadline(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_scaling_activities.return_value = {'Activities': []}
+    mock_client.describe_auto_scaling_groups.return_value = in_service_group(4, 'InService')
+
+    watch = check_watch(token(), {}, now=1600.0)
+
+    assert watch.status == FAILED
+    assert watch.message == "No launch activity seen for ASG 'my-asg'; 2 of 4 capacity InService."
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_pending(mock_boto3_client):
+    mock_boto3_client.return_value.describe_scaling_activities.return_value = {
+        'Activities': [activity('a', 'PreInService'), activity('b', 'Successful')]
+    }
+
+    watch = check_watch(token(), {}, now=1100.0)
+
+    assert watch.status == WATCHING
+    assert watch.message == "1 launch activities pending for ASG 'my-asg'."
+    assert json.loads(watch.continuation_token)['since'] == 900.0
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_deadline(mock_boto3_client):
+    mock_boto3_client.return_value.describe_scaling_activities.return_value = {
+        'Activities': [activity('a', 'InProgress')]
+    }
+    watch = check_watch(token(), {}, now=1600.0)
+
+    assert watch.status == FAILED
+    assert watch.message == "Timed out watching ASG 'my-asg' with 1 launches pending."
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_failure(mock_boto3_client):
+    mock_boto3_client.return_value.describe_scaling_activities.return_value = {
+        'Activities': [activity('a', 'Failed', "We currently do not have sufficient m5.large capacity.")]
+    }
+
+    watch = check_watch(token(), {}, now=1100.0)
+
+    assert watch.status == FAILED
+    assert watch.message == (
+        "Launch failed for ASG 'my-asg': We currently do not have sufficient m5.large capacity."
+    )
+
+
+@patch('asg_scaler_lambda.launch_watcher.apply_instance_type_fallback')
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_fallback_after_repeated_failures(mock_boto3_client, mock_fallback):
+    params = {"fallbackInstanceTypes": ["m5a.large", "m6i.large"], "fallbackAfterFailures": 2}
+    describe = mock_boto3_client.return_value.describe_scaling_activities
+
+    describe.return_value = {'Activities': [activity('a', 'Failed', "Insufficient capacity.")]}
+    first = check_watch(token(), params, now=1100.0)
+    assert first.status == WATCHING
+    mock_fallback.assert_not_called()
+
+    describe.return_value = {'Activities': [activity('b', 'Cancelled'), activity('a', 'Failed')]}
+    second = check_watch(first.continuation_token, params, now=1200.0)
+    assert second.status == WATCHING
+    mock_fallback.assert_called_once_with("my-asg", ["m5a.large", "m6i.large"])
+    assert json.loads(second.continuation_token)['fallback']
+
+    describe.return_value = {'Activities': [activity('c', 'Failed', "Still failing."), activity('b', 'Cancelled')]}
+    third = check_watch(second.continuation_token, params, now=1300.0)
+    assert third.status == FAILED
+    assert third.message == "Launch failed for ASG 'my-asg': Still failing."
+
+
+def test_check_watch_invalid_token():
+    with pytest.raises(ValueError) as excinfo:
+        check_watch("invalid_json", {})
+    assert str(excinfo.value) == "Invalid continuation token."
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_ignores_failure_retried_successfully(mock_boto3_client):
+    mock_boto3_client.return_value.describe_scaling_activities.return_value = {
+        'Activities': [activity('b', 'Successful', started=1050.0), activity('a', 'Failed', "Insufficient capacity.")]
+    }
+
+    watch = check_watch(token(), {}, now=1100.0)
+
+    assert watch.status == LAUNCHED
+    assert watch.message == "All launch activities for ASG 'my-asg' succeeded."
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_prescaled_in_service(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = in_service_group(4, 'InService', 'InService')
+
+    watch = check_watch(token(prescaled=True), {}, now=1100.0)
+
+    assert watch.status == LAUNCHED
+    assert watch.message == "ASG 'my-asg' has 4 of 4 capacity InService."
+    mock_client.describe_scaling_activities.assert_not_called()
+
+
+@patch('asg_scaler_lambda.launch_watcher.boto3.client')
+def test_check_watch_prescaled_launch_failure(mock_boto3_client):
+    mock_client = mock_boto3_client.return_value
+    mock_client.describe_auto_scaling_groups.return_value = in_service_group(4, 'InService')
+    mock_client.describe_scaling_activities.return_value = {
+        'Activities': [activity('a', 'Failed', "Insufficient capacity.")]
+    }
+
+    watch = check_watch(token(prescaled=True), {}, now=1100.0)
+
+    assert watch.status == FAILED
+    mock_client.describe_auto_scaling_groups.assert_called_once()
@@ -0,0 +1,150 @@
+from asg_scaler_lambda.profile_store import (
+    ProfileError, clear_profile_cache, get_profiles, resolve_user_parameters
+)
+from unittest.mock import patch, MagicMock
+import json
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.delenv('PROFILE_BACKEND', raising=False)
+    monkeypatch.delenv('PROFILE_CACHE_TTL', raising=False)
+    clear_profile_cache()
+    yield
+    clear_profile_cache()
+
+
+def ssm_response(*profiles, invalid=()):
+    return {
+        'Parameters': [
+            {'Name': f"/asg-scaler/profiles/{name}", 'Value': json.dumps(value), 'Version': version}
+            for name, value, version in profiles
+        ],
+        'InvalidParameters': list(invalid)
+    }
+
+############################################
+# get_profiles unit tests (SSM backend)
+############################################
+
+
+@patch('asg_scaler_lambda.profile_store.get_ssm_client')
+def test_get_profiles_batched(mock_get_client):
+    mock_client = MagicMock()
+    mock_client.get_parameters.return_value = ssm_response(
+        ("web", {"asgName": "web"}, 1), ("api", {"asgName": "api"}, 2)
+    )
+    mock_get_client.return_value = mock_client
+
+    profiles = get_profiles(["web", "api"])
+
+    assert profiles == {"web": {"asgName": "web"}, "api": {"asgName": "api"}}
+    mock_client.get_parameters.assert_called_once_with(
+        Names=["/asg-scaler/profiles/web", "/asg-scaler/profiles/api"], WithDecryption=True
+    )
+
+
+@patch('asg_scaler_lambda.profile_store.get_ssm_client')
+def test_get_profiles_cached_across_calls(mock_get_client):
+    mock_client = MagicMock()
+    mock_client.get_parameters.return_value = ssm_response(("web", {"asgName": "web"}, 1))
+    mock_get_client.return_value = mock_client
+
+    get_profiles(["web"])
+    get_profiles(["web"])
+
+    mock_client.get_parameters.assert_called_once()
+
+
+@patch('asg_scaler_lambda.profile_store.get_ssm_client')
+def test_get_profiles_refetched_after_ttl(mock_get_client, monkeypatch):
+    monkeypatch.setenv('PROFILE_CACHE_TTL', '0')
+    mock_client = MagicMock()
+    mock_client.get_parameters.side_effect = [
+        ssm_response(("web", {"asgName": "web"}, 1)),
+        ssm_response(("web", {"asgName": "web-v2"}, 2)),
+    ]
+    mock_get_client.return_value = mock_client
+
+    assert get_profiles(["web"]) == {"web": {"asgName": "web"}}
+    assert get_profiles(["web"]) == {"web": {"asgName": "web-v2"}}
+    assert mock_client.get_parameters.call_count == 2
+
+
+@patch('asg_scaler_lambda.profile_store.get_ssm_client')
+def test_get_profiles_not_found(mock_get_client):
+    mock_client = MagicMock()
+    mock_client.get_parameters.return_value = ssm_response(invalid=["/asg-scaler/profiles/missing"])
+    mock_get_client.return_value = mock_client
+
+    with pytest.raises(ProfileError) as excinfo:
+        get_profiles(["missing"])
+    assert str(excinfo.value) == "Profile not found: missing."
+
+
+@patch('asg_scaler_lambda.profile_store.get_ssm_client')
+def test_get_profiles_api_exception(mock_get_client):
+    mock_client = MagicMock()
+    mock_client.get_parameters.side_effect = Exception("AWS service exception")
+    mock_get_client.return_value = mock_client
+
+    with pytest.raises(ProfileError):
+        get_profiles(["web"])
+
+############################################
+# get_profiles unit tests (file backend)
+############################################
+
+
+def test_get_profiles_file_backend(tmp_path, monkeypatch):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"web": {"asgName": "web", "minCapacity": 0}}))
+    monkeypatch.setenv('PROFILE_BACKEND', 'file')
+    monkeypatch.setenv('PROFILE_FILE', str(path))
+
+    assert get_profiles(["web"]) == {"web": {"asgName": "web", "minCapacity": 0}}
+
+
+def test_get_profiles_unknown_backend(monkeypatch):
+    monkeypatch.setenv('PROFILE_BACKEND', 'dynamodb')
+    with pytest.raises(ProfileError) as excinfo:
+        get_profiles(["web"])
+    assert str(excinfo.value) == "Unknown profile backend 'dynamodb'."
+
+############################################
+# resolve_user_parameters unit tests
+############################################
+
+
+def test_resolve_user_parameters_without_profile():
+    params = {"asgName": "web"}
+    assert resolve_user_parameters(params) is params
+
+
+@patch('asg_scaler_lambda.profile_store.get_profiles')
+def test_resolve_user_parameters_inline_overrides(mock_get_profiles):
+    mock_get_profiles.return_value = {"web": {"asgName": "web", "desiredCapacity": 2}}
+    resolved = resolve_user_parameters({"profile": "web", "desiredCapacity": 4})
+    assert resolved == {"asgName": "web", "desiredCapacity": 4}
+
+
+def test_get_profiles_evicts_deleted_profile(tmp_path, monkeypatch):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"web": {"asgName": "web"}}))
+    monkeypatch.setenv('PROFILE_BACKEND', 'file')
+    monkeypatch.setenv('PROFILE_FILE', str(path))
+    monkeypatch.setenv('PROFILE_CACHE_TTL', '0')
+
+    assert get_profiles(["web"]) == {"web": {"asgName": "web"}}
+    path.write_text(json.dumps({}))
+    with pytest.raises(ProfileError) as excinfo:
+        get_profiles(["web"])
+    assert str(excinfo.value) == "Profile not found: web."
+
+
+@pytest.mark.parametrize("name", [["a"], {"a": 1}, "", 7, None])
+def test_resolve_user_parameters_invalid_profile_name(name):
+    with pytest.raises(ProfileError) as excinfo:
+        resolve_user_parameters({"profile": name})
+    assert str(excinfo.value) == "Profile name must be a non-empty string."
@@ -0,0 +1,84 @@
+from asg_scaler_lambda.routing_config import (
+    ConfigError, get_configured_approvals, get_prescale_profiles, get_pipeline_prescale_profiles, load_json_env
+)
+import json
+import pytest
+
+############################################
+# load_json_env unit tests
+############################################
+
+
+def test_load_json_env_unset(monkeypatch):
+    monkeypatch.delenv('PRESCALE_TRIGGERS', raising=False)
+    assert load_json_env('PRESCALE_TRIGGERS') == {}
+
+
+@pytest.mark.parametrize("value, message", [
+    ("invalid_json", "PRESCALE_TRIGGERS is not valid JSON."),
+    ("[1, 2]", "PRESCALE_TRIGGERS must be a JSON object."),
+])
+def test_load_json_env_invalid(monkeypatch, value, message):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', value)
+    with pytest.raises(ConfigError) as excinfo:
+        load_json_env('PRESCALE_TRIGGERS')
+    assert str(excinfo.value) == message
+
+############################################
+# get_prescale_profiles unit tests
+############################################
+
+
+def test_get_prescale_profiles(monkeypatch):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', json.dumps({"pipe": {"Build": ["web", "api"], "Test": "web"}}))
+    assert get_prescale_profiles("pipe", "Build") == ["web", "api"]
+    assert get_prescale_profiles("pipe", "Test") == ["web"]
+    assert get_prescale_profiles("pipe", "Deploy") == []
+    assert get_prescale_profiles("other", "Build") == []
+
+
+@pytest.mark.parametrize("triggers", [
+    {"pipe": ["Build"]},
+    {"pipe": {"Build": {"profile": "web"}}},
+    {"pipe": {"Build": ["web", 3]}},
+])
+def test_get_prescale_profiles_wrong_shape(monkeypatch, triggers):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', json.dumps(triggers))
+    with pytest.raises(ConfigError):
+        get_prescale_profiles("pipe", "Build")
+
+############################################
+# get_configured_approvals unit tests
+############################################
+
+
+def test_get_pipeline_prescale_profiles(monkeypatch):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', json.dumps({
+        "test-pipeline": {"Build": "web", "Test": ["web", "api"]}, "other-pipeline": {"Build": "db"}
+    }))
+    assert get_pipeline_prescale_profiles("test-pipeline") == ["web", "api"]
+    assert get_pipeline_prescale_profiles("unknown-pipeline") == []
+
+
+def test_get_pipeline_prescale_profiles_wrong_shape(monkeypatch):
+    monkeypatch.setenv('PRESCALE_TRIGGERS', json.dumps({"test-pipeline": {"Build": [1]}}))
+    with pytest.raises(ConfigError):
+        get_pipeline_prescale_profiles("test-pipeline")
+
+
+def test_get_configured_approvals(monkeypatch):
+    targets = [{"pipelineName": "p", "stageName": "s", "actionName": "a"}]
+    monkeypatch.setenv('APPROVAL_TARGETS', json.dumps({"app/group": targets}))
+    assert get_configured_approvals("app", "group") == targets
+    assert get_configured_approvals("app", "other") == []
+
+
+@pytest.mark.parametrize("targets", [
+    {"pipelineName": "p", "stageName": "s", "actionName": "a"},
+    ["p/s/a"],
+    [{"pipelineName": "p", "stageName": "s"}],
+])
+def test_get_configured_approvals_wrong_shape(monkeypatch, targets):
+    monkeypatch.setenv('APPROVAL_TARGETS', json.dumps({"app/group": targets}))
+    with pytest.raises(ConfigError):
+        get_configured_approvals("app", "group")
@@ -0,0 +1,150 @@
+from asg_scaler_lambda.timeline import (
+    PhaseEvent, SqliteTimelineStore, build_report, format_report, get_timeline_store, main,
+    parse_window, percentile, phase_durations, record_phase, reset_timeline_store
+)
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def fresh_store(monkeypatch):
+    monkeypatch.delenv('TIMELINE_BACKEND', raising=False)
+    reset_timeline_store()
+    yield
+    reset_timeline_store()
+
+
+def seed(store, pipeline_name, execution_id, phases):
+    for phase, timestamp in phases:
+        store.record(PhaseEvent(pipeline_name, execution_id, "test-asg", phase, timestamp))
+
+############################################
+# record_phase unit tests
+############################################
+
+
+def test_record_phase_disabled_by_default():
+    record_phase("test-pipeline", "exec-1", "test-asg", "scale-out")
+    assert get_timeline_store() is None
+
+
+def test_record_phase_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setenv('TIMELINE_BACKEND', 'sqlite')
+    monkeypatch.setenv('TIMELINE_DB', str(tmp_path / "timeline.db"))
+
+    record_phase("test-pipeline", "exec-1", "test-asg", "scale-out")
+
+    events = get_timeline_store().events_since(0)
+    assert len(events) == 1
+    assert events[0].phase == "scale-out"
+    assert events[0].asg_name == "test-asg"
+
+############################################
+# phase_durations and percentile unit tests
+############################################
+
+
+def test_phase_durations_per_execution():
+    events = [
+        PhaseEvent("pipe", "exec-1", "asg", "scale-out", 100.0),
+        PhaseEvent("pipe", "exec-1", None, "codedeploy", 400.0),
+        PhaseEvent("pipe", "exec-1", None, "approval", 410.0),
+        PhaseEvent("pipe", "exec-2", "asg", "scale-out", 1000.0),
+        PhaseEvent("pipe", "exec-2", None, "codedeploy", 1200.0),
+        PhaseEvent("pipe", None, "asg", "scale-in", 1300.0),
+    ]
+    assert phase_durations(events) == {
+        ("pipe", "codedeploy"): [300.0, 200.0],
+        ("pipe", "approval"): [10.0],
+    }
+
+
+def test_percentile_interpolates():
+    assert percentile([10, 20, 30, 40], 50) == 25
+    assert percentile([10, 20, 30, 40], 100) == 40
+    assert percentile([5], 99) == 5
+
+############################################
+# parse_window unit tests
+############################################
+
+
+def test_parse_window():
+    assert parse_window("90m") == 5400
+    assert parse_window("7d") == 604800
+
+
+@pytest.mark.parametrize("window", ["", "7", "7w", "-1d", "xd"])
+def test_parse_window_invalid(window):
+    with pytest.raises(ValueError):
+        parse_window(window)
+
+############################################
+# build_report and CLI unit tests
+############################################
+
+
+def test_build_report_window(tmp_path):
+    store = SqliteTimelineStore(str(tmp_path / "timeline.db"))
+    seed(store, "pipe", "exec-old", [("scale-out", 0.0), ("codedeploy", 50.0)])
+    seed(store, "pipe", "exec-1", [("scale-out", 1000.0), ("codedeploy", 1300.0), ("approval", 1320.0)])
+
+    rows = build_report(store, 600, percentiles=(50,), now=1500.0)
+
+    assert rows == [
+        ("pipe", "approval", 1, {50: 20.0}),
+        ("pipe", "codedeploy", 1, {50: 300.0}),
+    ]
+    assert format_report(rows, (50,)).splitlines()[1] == "pipe\tapproval\t1\t20.0s"
+
+
+def test_build_report_stage_sequence(tmp_path):
+    store = SqliteTimelineStore(str(tmp_path / "timeline.db"))
+    seed(store, "pipe", "exec-1", [
+        ("stage-started:Build", 1000.0),
+        ("prescale", 1002.0),
+        ("stage:Build", 1400.0),
+        ("stage-started:Deploy", 1401.0),
+        ("scale", 1410.0),
+        ("inservice", 1500.0),
+        ("codedeploy", 1800.0),
+        ("approval", 1805.0),
+        ("stage:Deploy", 1806.0),
+    ])
+
+    rows = build_report(store, 3600, percentiles=(50,), now=2000.0)
+
+    assert {phase: values[50] for _, phase, _, values in rows} == {
+        "prescale": 2.0,
+        "stage:Build": 400.0,
+        "scale": 9.0,
+        "inservice": 90.0,
+        "codedeploy": 300.0,
+        "approval": 5.0,
+        "stage:Deploy": 405.0,
+    }
+
+
+def test_phase_durations_stage_started_outside_window():
+    events = [
+        PhaseEvent("pipe", "exec-1", None, "stage:Build", 400.0),
+        PhaseEvent("pipe", "exec-1", "asg", "scale", 410.0),
+    ]
+    assert phase_durations(events) == {("pipe", "scale"): [10.0]}
+
+
+def test_main_prints_report(tmp_path, capsys):
+    path = tmp_path / "timeline.db"
+    store = SqliteTimelineStore(str(path))
+    seed(store, "pipe", "exec-1", [("scale-out", 0.0), ("codedeploy", 120.0)])
+
+    assert main(["--db", str(path), "--window", "100000d", "--percentiles", "50,90"]) == 0
+
+    output = capsys.readouterr().out.splitlines()
+    assert output == ["pipeline\tphase\tcount\tp50\tp90", "pipe\tcodedeploy\t1\t120.0s\t120.0s"]
+
+
+@pytest.mark.parametrize("percentiles", ["150", "50,-1"])
+def test_main_rejects_out_of_range_percentiles(tmp_path, capsys, percentiles):
+    with pytest.raises(SystemExit):
+        main(["--db", str(tmp_path / "timeline.db"), "--percentiles", percentiles])
+    assert "Percentiles must be between 0 and 100" in capsys.readouterr().err